@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import SolarDataUpload, District, SolarYearData
+from .models import (
+	SolarDataUpload,
+	District,
+	SolarYearData,
+	SolarYearSummary,
+	SolarDistrictSummary,
+	ForecastRun,
+	DistrictForecast,
+	ImportJob,
+)
 
 
 @admin.register(SolarDataUpload)
@@ -30,3 +39,70 @@ class SolarYearDataAdmin(admin.ModelAdmin):
 	search_fields = ("district__code", "district__name", "year_label")
 	autocomplete_fields = ("district",)
 	ordering = ("year_label", "district__name")
+
+
+@admin.register(SolarYearSummary)
+class SolarYearSummaryAdmin(admin.ModelAdmin):
+	list_display = (
+		"year_label",
+		"district_count",
+		"target",
+		"booking",
+		"installed",
+		"rejected",
+		"updated_at",
+	)
+	ordering = ("year_label",)
+
+
+@admin.register(SolarDistrictSummary)
+class SolarDistrictSummaryAdmin(admin.ModelAdmin):
+	list_display = (
+		"district",
+		"year_count",
+		"target",
+		"booking",
+		"installed",
+		"rejected",
+		"updated_at",
+	)
+	search_fields = ("district__code", "district__name")
+	ordering = ("district__name",)
+
+
+@admin.register(ForecastRun)
+class ForecastRunAdmin(admin.ModelAdmin):
+	list_display = ("engine", "generation", "created_at")
+	list_filter = ("engine",)
+
+
+@admin.register(DistrictForecast)
+class DistrictForecastAdmin(admin.ModelAdmin):
+	list_display = (
+		"district",
+		"run",
+		"predicted_next_year_installed",
+		"prediction_lower",
+		"prediction_upper",
+		"growth_rate",
+		"risk_level",
+	)
+	list_filter = ("run__engine", "risk_level")
+	search_fields = ("district__code", "district__name")
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+	list_display = (
+		"original_filename",
+		"year_label",
+		"status",
+		"rows_processed",
+		"replace_existing",
+		"created_by",
+		"created_at",
+		"finished_at",
+	)
+	list_filter = ("status", "replace_existing", "year_label")
+	search_fields = ("original_filename", "year_label", "created_by__username")
+	readonly_fields = ("created_at", "started_at", "finished_at")
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .dataloader import METRIC_FIELDS
+from .partials import get_solar_partials
+
+
+# Distinct (years, districts) filters kept per dataset; the dashboards only
+# ever ask for a handful of them.
+AGGREGATE_CACHE_SIZE = 32
+
+
+def normalize_filter(values):
+    """Stripped, de-duplicated and sorted filter values; None means no filter."""
+    if values is None:
+        return None
+    return tuple(sorted({str(value).strip() for value in values if str(value).strip()}))
+
+
+class SolarAggregate:
+    """District and year totals for one (years, districts) slice of a dataset.
+
+    Every array is laid out on the full dataset tables (``dataset.district_codes``
+    rows, ``dataset.years`` columns) with zeros outside the slice, so positions
+    can be used directly against the dataset. Built from the cached
+    ``SolarPartials`` cubes instead of another pass over the rows.
+    """
+
+    def __init__(self, dataset, years=None, districts=None):
+        self.dataset = dataset
+        self.years = years
+        self.districts = districts
+
+        partials = get_solar_partials(dataset)
+
+        year_selected = np.ones(dataset.num_years, dtype=bool)
+        if years is not None:
+            year_selected = np.isin(dataset.years, years)
+
+        district_selected = np.ones(dataset.num_districts, dtype=bool)
+        if districts is not None:
+            district_selected = np.isin(dataset.district_names, districts)
+
+        self.cell_selected = district_selected[:, None] & year_selected[None, :]
+
+        self.cube_counts = np.where(self.cell_selected, partials.counts, 0).astype(np.int64)
+        self.cubes = {
+            metric: np.where(self.cell_selected, np.rint(partials.sums[metric]), 0).astype(np.int64)
+            for metric in METRIC_FIELDS
+        }
+
+        self.district_counts = self.cube_counts.sum(axis=1)
+        self.district_totals = {metric: cube.sum(axis=1) for metric, cube in self.cubes.items()}
+        self.year_counts = self.cube_counts.sum(axis=0)
+        self.year_totals = {metric: cube.sum(axis=0) for metric, cube in self.cubes.items()}
+        self.totals = {metric: int(values.sum()) for metric, values in self.district_totals.items()}
+
+        self.merged = partials.merge_cells(self.cell_selected)
+
+    @property
+    def present(self):
+        """Districts with at least one row in the slice."""
+        return self.district_counts > 0
+
+    @property
+    def present_years(self):
+        return self.year_counts > 0
+
+    @property
+    def row_mask(self):
+        """Row mask of the slice for row-level consumers such as the analytics."""
+        return self.cell_selected[self.dataset.district_idx, self.dataset.year_idx]
+
+    def top_districts(self, metric, limit=None, reverse=True):
+        """Positions of present districts ordered by ``metric``, ties by name then code."""
+        positions = np.flatnonzero(self.present)
+        values = self.district_totals[metric][positions]
+        names = np.array(self.dataset.district_names, dtype=object)[positions]
+        codes = np.array(self.dataset.district_codes, dtype=object)[positions]
+        order = np.lexsort((codes, names, -values if reverse else values))
+        return positions[order][:limit]
+
+
+_aggregate_cache = {"dataset": None, "entries": OrderedDict()}
+_aggregate_cache_lock = threading.Lock()
+
+
+def get_aggregate(dataset, years=None, districts=None):
+    """Return the ``SolarAggregate`` for ``dataset`` filtered to ``years`` and ``districts``.
+
+    Filters are normalized first, so views asking for the same slice in a
+    different order (or with duplicates) share one cache entry. The cache is
+    dropped when the dataset changes.
+    """
+    key = (normalize_filter(years), normalize_filter(districts))
+
+    with _aggregate_cache_lock:
+        if _aggregate_cache["dataset"] is dataset:
+            entries = _aggregate_cache["entries"]
+            if key in entries:
+                entries.move_to_end(key)
+                return entries[key]
+
+    aggregate = SolarAggregate(dataset, *key)
+
+    with _aggregate_cache_lock:
+        if _aggregate_cache["dataset"] is not dataset:
+            _aggregate_cache["dataset"] = dataset
+            _aggregate_cache["entries"] = OrderedDict()
+        entries = _aggregate_cache["entries"]
+        entries[key] = aggregate
+        entries.move_to_end(key)
+        while len(entries) > AGGREGATE_CACHE_SIZE:
+            entries.popitem(last=False)
+
+    return aggregate
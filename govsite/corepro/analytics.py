@@ -1,59 +1,69 @@
-from collections import defaultdict
+import numpy as np
+from scipy import stats
 
-def calculate_descriptive_metrics(data):
-    district_data = defaultdict(list)
+
+def _safe_ratio(numerator, denominator):
+    ratio = np.zeros(len(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=ratio, where=denominator > 0)
+    return ratio
+
+
+def calculate_descriptive_metrics(dataset, mask=None):
+    district_idx = dataset.district_idx
+    target = dataset["target"]
+    booking = dataset["booking"]
+    installed = dataset["installed"]
+    rejected = dataset["rejected"]
+
+    if mask is not None:
+        district_idx = district_idx[mask]
+        target = target[mask]
+        booking = booking[mask]
+        installed = installed[mask]
+        rejected = rejected[mask]
+
+    # Per-record ratios, zero where the denominator is zero
+    eff = _safe_ratio(installed, booking)
+    rejection = _safe_ratio(rejected, booking)
+    target_rate = _safe_ratio(installed, target)
 
     # Group by district
-    for row in data:
-        district_data[row["district"]].append(row)
+    num_districts = dataset.num_districts
+    counts = np.bincount(district_idx, minlength=num_districts)
+    safe_counts = np.maximum(counts, 1)
+
+    avg_eff = np.bincount(district_idx, weights=eff, minlength=num_districts) / safe_counts
+    avg_target_rate = np.bincount(district_idx, weights=target_rate, minlength=num_districts) / safe_counts
+    avg_rejection = np.bincount(district_idx, weights=rejection, minlength=num_districts) / safe_counts
+
+    # Combined Score
+    score = (0.4 * avg_eff) + (0.4 * avg_target_rate) + (0.2 * (1 - avg_rejection))
+
+    # Districts in order of first appearance, as the row-wise grouping produced
+    present = np.flatnonzero(counts)
+    first_seen = np.full(num_districts, len(district_idx), dtype=np.int64)
+    np.minimum.at(first_seen, district_idx, np.arange(len(district_idx)))
+    present = present[np.argsort(first_seen[present], kind="stable")]
 
     results = []
 
-    for district, records in district_data.items():
-        total_eff = 0
-        total_target_rate = 0
-        total_rejection = 0
-        count = 0
-
-        for r in records:
-            if r["booking"] > 0:
-                eff = r["installed"] / r["booking"]
-                rejection = r["rejected"] / r["booking"]
-            else:
-                eff = 0
-                rejection = 0
-
-            if r["target"] > 0:
-                target_rate = r["installed"] / r["target"]
-            else:
-                target_rate = 0
-
-            total_eff += eff
-            total_target_rate += target_rate
-            total_rejection += rejection
-            count += 1
-
-        avg_eff = total_eff / count if count else 0
-        avg_target_rate = total_target_rate / count if count else 0
-        avg_rejection = total_rejection / count if count else 0
-
-        # Combined Score
-        score = (0.4 * avg_eff) + (0.4 * avg_target_rate) + (0.2 * (1 - avg_rejection))
+    for idx in present.tolist():
+        district_score = float(score[idx])
 
         # Classification
-        if score >= 0.75:
+        if district_score >= 0.75:
             category = "High"
-        elif score >= 0.55:
+        elif district_score >= 0.55:
             category = "Moderate"
         else:
             category = "Low"
 
         results.append({
-            "district": district,
-            "avg_efficiency": round(avg_eff, 3),
-            "avg_target_rate": round(avg_target_rate, 3),
-            "avg_rejection": round(avg_rejection, 3),
-            "score": round(score, 3),
+            "district": dataset.district_names[idx],
+            "avg_efficiency": round(float(avg_eff[idx]), 3),
+            "avg_target_rate": round(float(avg_target_rate[idx]), 3),
+            "avg_rejection": round(float(avg_rejection[idx]), 3),
+            "score": round(district_score, 3),
             "category": category
         })
 
@@ -61,3 +71,40 @@ def calculate_descriptive_metrics(data):
     results = sorted(results, key=lambda x: x["score"], reverse=True)
 
     return results
+
+
+def correlation_matrix(matrix):
+    """Pearson correlation and least-squares fit for every pair of columns.
+
+    ``matrix`` is a samples x metrics array. Entry ``[i, j]`` of ``slope`` and
+    ``intercept`` describes the regression of column ``j`` on column ``i``;
+    ``r``, ``p`` and ``r_squared`` are symmetric. Pairs involving a constant
+    column, or fewer than three samples, are flagged in ``valid``.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = matrix.shape[0]
+
+    means = matrix.mean(axis=0) if n else np.zeros(matrix.shape[1])
+    centered = matrix - means
+    sum_squares = centered.T @ centered
+    spread = np.diag(sum_squares)
+
+    varying = spread > 0
+    valid = np.outer(varying, varying) & (n >= 3)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.clip(sum_squares / np.sqrt(np.outer(spread, spread)), -1.0, 1.0)
+        slope = sum_squares / spread[:, None]
+        intercept = means[None, :] - slope * means[:, None]
+        t_stat = r * np.sqrt((n - 2) / (1 - r * r))
+        p = 2 * stats.t.sf(np.abs(t_stat), n - 2) if n > 2 else np.full_like(r, np.nan)
+
+    return {
+        "n": n,
+        "valid": valid,
+        "r": np.where(valid, r, np.nan),
+        "p": np.where(valid, p, np.nan),
+        "r_squared": np.where(valid, r * r, np.nan),
+        "slope": np.where(valid, slope, np.nan),
+        "intercept": np.where(valid, intercept, np.nan),
+    }
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CoreproConfig(AppConfig):
     name = "corepro"
+
+    def ready(self):
+        from . import checks  # noqa: F401
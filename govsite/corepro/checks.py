@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .import_jobs import DEFAULT_IMPORT_EXECUTOR
+
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_import_progress_cache(app_configs, **kwargs):
+    """Background imports report progress through the default cache, which
+    every web and import process must share."""
+    executor = getattr(settings, "SOLAR_IMPORT_EXECUTOR", DEFAULT_IMPORT_EXECUTOR)
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if executor == "inline" or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            "Import progress is kept in a cache local to each process, so the "
+            "dashboard cannot see the row counts of running imports.",
+            hint="Point CACHES['default'] at a backend shared by all processes, "
+            "such as Redis, Memcached or FileBasedCache.",
+            id="corepro.W001",
+        )
+    ]
@@ -1,28 +1,199 @@
-from .models import SolarYearData
+import threading
 
+import numpy as np
 
-def load_solar_data_from_db():
-    records = (
-        SolarYearData.objects.select_related("district")
-        .all()
-        .order_by("year_label", "district__name")
-    )
+from .models import SolarDataGeneration, SolarYearData
 
-    structured_data = []
-    for record in records:
-        structured_data.append(
-            {
-                "Distcode": record.district.code,
-                "district": record.district.name,
-                "year": record.year_label,
-                "target": int(record.target or 0),
-                "booking": int(record.booking or 0),
-                "installed": int(record.installed or 0),
-                "rejected": int(record.rejected or 0),
-            }
+
+METRIC_FIELDS = ("target", "booking", "installed", "rejected")
+
+
+class SolarDataset:
+    """Column-oriented copy of the stored ``SolarYearData`` rows.
+
+    Districts and years are integer coded: ``district_idx`` points into the
+    ``district_codes``/``district_names`` lookup tables (ordered by name, then
+    code) and ``year_idx`` points into the sorted ``years`` table. Each metric
+    in ``METRIC_FIELDS`` is an int64 array aligned with those code columns.
+    ``generation`` is the ``SolarDataGeneration`` value the rows were read at.
+    """
+
+    def __init__(self, district_codes, district_names, years, district_idx, year_idx, metrics, generation=None):
+        self.district_codes = list(district_codes)
+        self.district_names = list(district_names)
+        self.years = list(years)
+        self.district_idx = np.asarray(district_idx, dtype=np.int64)
+        self.year_idx = np.asarray(year_idx, dtype=np.int64)
+        self.metrics = {
+            name: np.asarray(metrics[name], dtype=np.int64)
+            for name in METRIC_FIELDS
+        }
+        self.generation = generation
+
+    def __len__(self):
+        return len(self.district_idx)
+
+    def __getitem__(self, metric):
+        return self.metrics[metric]
+
+    @property
+    def num_districts(self):
+        return len(self.district_codes)
+
+    @property
+    def num_years(self):
+        return len(self.years)
+
+    @classmethod
+    def from_rows(cls, rows, generation=None):
+        """Build a dataset from ``(code, name, year, target, booking, installed, rejected)`` tuples."""
+        rows = list(rows)
+
+        district_lookup = {}
+        for code, name, *_ in rows:
+            district_lookup.setdefault(str(code or "").strip(), str(name or "").strip())
+
+        ordered_codes = sorted(district_lookup, key=lambda code: (district_lookup[code], code))
+        district_positions = {code: idx for idx, code in enumerate(ordered_codes)}
+
+        years = sorted({str(row[2] or "").strip() for row in rows})
+        year_positions = {year: idx for idx, year in enumerate(years)}
+
+        district_idx = np.fromiter(
+            (district_positions[str(row[0] or "").strip()] for row in rows),
+            dtype=np.int64,
+            count=len(rows),
         )
+        year_idx = np.fromiter(
+            (year_positions[str(row[2] or "").strip()] for row in rows),
+            dtype=np.int64,
+            count=len(rows),
+        )
+        metrics = {
+            name: np.fromiter((int(row[3 + offset] or 0) for row in rows), dtype=np.int64, count=len(rows))
+            for offset, name in enumerate(METRIC_FIELDS)
+        }
+
+        return cls(
+            ordered_codes,
+            [district_lookup[code] for code in ordered_codes],
+            years,
+            district_idx,
+            year_idx,
+            metrics,
+            generation=generation,
+        )
+
+    def year_mask(self, years=None):
+        """Row mask selecting the given year labels (all rows when ``years`` is None)."""
+        if years is None:
+            return np.ones(len(self), dtype=bool)
+
+        wanted = np.zeros(self.num_years, dtype=bool)
+        positions = {year: idx for idx, year in enumerate(self.years)}
+        for year in years:
+            if year in positions:
+                wanted[positions[year]] = True
+        return wanted[self.year_idx]
 
-    return structured_data
+    def district_mask(self, district_positions):
+        """Row mask selecting rows whose district index is in ``district_positions``."""
+        wanted = np.zeros(self.num_districts, dtype=bool)
+        wanted[np.asarray(list(district_positions), dtype=np.int64)] = True
+        return wanted[self.district_idx]
+
+    def district_positions_for_names(self, names):
+        names = set(names)
+        return [idx for idx, name in enumerate(self.district_names) if name in names]
+
+    def district_counts(self, mask=None):
+        district_idx = self.district_idx if mask is None else self.district_idx[mask]
+        return np.bincount(district_idx, minlength=self.num_districts)
+
+    def district_sums(self, metric, mask=None):
+        district_idx = self.district_idx if mask is None else self.district_idx[mask]
+        values = self.metrics[metric] if mask is None else self.metrics[metric][mask]
+        return np.bincount(district_idx, weights=values, minlength=self.num_districts).astype(np.int64)
+
+    def year_sums(self, metric, mask=None):
+        year_idx = self.year_idx if mask is None else self.year_idx[mask]
+        values = self.metrics[metric] if mask is None else self.metrics[metric][mask]
+        return np.bincount(year_idx, weights=values, minlength=self.num_years).astype(np.int64)
+
+    def district_year_sums(self, metric, mask=None):
+        """``num_districts x num_years`` matrix of summed ``metric`` values."""
+        return self.district_year_totals(self.metrics[metric], mask).astype(np.int64)
+
+    def district_year_totals(self, values, mask=None):
+        """Sum an arbitrary per-row ``values`` array into a district x year float matrix."""
+        cells = self.district_idx * self.num_years + self.year_idx
+        if mask is not None:
+            cells = cells[mask]
+            values = values[mask]
+        flat = np.bincount(cells, weights=values, minlength=self.num_districts * self.num_years)
+        return flat.reshape(self.num_districts, self.num_years)
+
+    def district_year_counts(self, mask=None):
+        cells = self.district_idx * self.num_years + self.year_idx
+        if mask is not None:
+            cells = cells[mask]
+        flat = np.bincount(cells, minlength=self.num_districts * self.num_years)
+        return flat.reshape(self.num_districts, self.num_years)
+
+    def district_series(self, metric, mask=None):
+        """Per-district arrays of ``metric`` values, in row (year) order."""
+        district_idx = self.district_idx if mask is None else self.district_idx[mask]
+        values = self.metrics[metric] if mask is None else self.metrics[metric][mask]
+        order = np.argsort(district_idx, kind="stable")
+        boundaries = np.cumsum(np.bincount(district_idx, minlength=self.num_districts))[:-1]
+        return np.split(values[order], boundaries)
+
+    def iter_rows(self, mask=None):
+        """Yield rows in the legacy ``load_solar_data_from_db`` dict shape."""
+        positions = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        columns = [self.metrics[name].tolist() for name in METRIC_FIELDS]
+        district_idx = self.district_idx.tolist()
+        year_idx = self.year_idx.tolist()
+
+        for pos in positions.tolist():
+            district = district_idx[pos]
+            yield {
+                "Distcode": self.district_codes[district],
+                "district": self.district_names[district],
+                "year": self.years[year_idx[pos]],
+                "target": columns[0][pos],
+                "booking": columns[1][pos],
+                "installed": columns[2][pos],
+                "rejected": columns[3][pos],
+            }
+
+
+# Process-wide cache of the last loaded dataset. Every worker compares the
+# cached generation with the database counter, so an import or delete in any
+# process invalidates it on the next request.
+_dataset_cache = {"generation": None, "dataset": None}
+_dataset_cache_lock = threading.Lock()
+
+
+def load_solar_data_from_db(generation=None):
+    records = (
+        SolarYearData.objects.order_by("year_label", "district__name")
+        .values_list("district__code", "district__name", "year_label", *METRIC_FIELDS)
+    )
+
+    return SolarDataset.from_rows(records, generation=generation)
 
 def load_solar_excel():
-    return load_solar_data_from_db()
+    generation = SolarDataGeneration.current()
+
+    with _dataset_cache_lock:
+        if _dataset_cache["generation"] == generation:
+            return _dataset_cache["dataset"]
+
+    dataset = load_solar_data_from_db(generation=generation)
+
+    with _dataset_cache_lock:
+        _dataset_cache["generation"] = generation
+        _dataset_cache["dataset"] = dataset
+
+    return dataset
@@ -0,0 +1,72 @@
+"""CSV and XLSX downloads of dashboard tables.
+
+Both formats take the rows as an iterable and write them one at a time: CSV
+goes straight into a ``StreamingHttpResponse``, and XLSX is written with
+openpyxl's write-only mode, which spools rows to disk rather than keeping
+cell objects. Memory therefore stays flat however many rows are exported.
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from openpyxl import Workbook
+
+from .upload_formats import CONTENT_TYPES
+
+
+EXPORT_FORMATS = ("csv", "xlsx")
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def _values(columns, rows):
+    for row in rows:
+        yield [row.get(key) for _, key in columns]
+
+
+def csv_export(filename, columns, rows):
+    writer = csv.writer(_Echo())
+
+    def content():
+        # The byte order mark lets Excel open the file as UTF-8
+        yield "\ufeff" + writer.writerow([heading for heading, _ in columns])
+        for values in _values(columns, rows):
+            yield writer.writerow(values)
+
+    response = StreamingHttpResponse(content(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = content_disposition_header(True, f"{filename}.csv")
+    return response
+
+
+def xlsx_export(filename, columns, rows, sheet_title):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    sheet.append([heading for heading, _ in columns])
+    for values in _values(columns, rows):
+        sheet.append(values)
+
+    # The temporary file is removed when the response closes it
+    handle = tempfile.TemporaryFile()
+    workbook.save(handle)
+    handle.seek(0)
+    return FileResponse(
+        handle,
+        as_attachment=True,
+        filename=f"{filename}.xlsx",
+        content_type=CONTENT_TYPES[".xlsx"],
+    )
+
+
+def export_response(file_format, filename, columns, rows, sheet_title="Sheet1"):
+    """Download ``rows`` (dicts) as CSV or XLSX; ``columns`` is ``[(heading, key), ...]``."""
+    if file_format == "csv":
+        return csv_export(filename, columns, rows)
+    if file_format == "xlsx":
+        return xlsx_export(filename, columns, rows, sheet_title)
+    raise Http404("Unknown export format.")
@@ -0,0 +1,130 @@
+"""Serving stored files after the view has checked access.
+
+settings.SOLAR_FILE_SERVING chooses who sends the bytes:
+
+* "python" (default): Django streams the file itself, honouring ``Range``,
+  ``If-Range``, ``If-None-Match`` and ``If-Modified-Since``.
+* "x-accel-redirect": nginx sends it. settings.SOLAR_X_ACCEL_REDIRECT_LOCATIONS
+  maps directories on disk to ``internal`` nginx locations, for example
+  ``{"/srv/govsite/media/": "/protected/media/"}``.
+* "x-sendfile": Apache mod_xsendfile, lighttpd and similar send the file
+  named by its absolute path.
+
+With either offload the worker returns as soon as the headers are built,
+however slow the client, and the web server handles ranges itself. Files
+outside the mapped directories fall back to Python.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+DEFAULT_FILE_SERVING = "python"
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+SINGLE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat_result):
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def accel_redirect_url(path):
+    locations = getattr(settings, "SOLAR_X_ACCEL_REDIRECT_LOCATIONS", {})
+    for directory, location in locations.items():
+        directory = os.path.join(os.path.realpath(directory), "")
+        if path.startswith(directory):
+            return location.rstrip("/") + "/" + quote(os.path.relpath(path, directory).replace(os.sep, "/"))
+    return None
+
+
+def requested_range(request, size, etag, last_modified):
+    """The ``(start, end)`` byte range to send, None for the whole file, or False if unsatisfiable.
+
+    Only single ranges are served partially; anything else gets the whole file.
+    """
+    header = request.headers.get("Range", "").replace(" ", "")
+    match = SINGLE_RANGE.match(header)
+    if not match or not any(match.groups()):
+        return None
+
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if not length or not size:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(path, start, end):
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            chunk = handle.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, filename, content_type, etag=None):
+    """Send ``path`` as an attachment named ``filename``, offloading it when configured.
+
+    ``etag`` defaults to one built from the file's mtime and size; pass a
+    content hash when there is one. Answers conditional requests with 304
+    (or 412) before any file work is done.
+    """
+    path = os.path.realpath(path)
+    stat_result = os.stat(path)
+    etag = etag or file_etag(stat_result)
+    last_modified = int(stat_result.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    mode = getattr(settings, "SOLAR_FILE_SERVING", DEFAULT_FILE_SERVING)
+    redirect_url = accel_redirect_url(path) if mode == "x-accel-redirect" else None
+
+    if redirect_url is not None:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = redirect_url
+    elif mode == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = path
+    else:
+        byte_range = requested_range(request, stat_result.st_size, etag, last_modified)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat_result.st_size}"
+            return response
+        if byte_range is None:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(iter_file_range(path, start, end), status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+            response["Content-Length"] = str(end - start + 1)
+        response["Accept-Ranges"] = "bytes"
+
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,100 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from .dataloader import load_solar_excel
+from .forecasting import FORECAST_ENGINES, calculate_district_forecast, get_forecast_engine
+from .models import District, DistrictForecast, ForecastRun
+
+
+logger = logging.getLogger(__name__)
+
+FORECAST_FIELDS = (
+    "latest_year",
+    "growth_rate",
+    "predicted_next_year_installed",
+    "prediction_lower",
+    "prediction_upper",
+    "risk_level",
+)
+
+
+def compute_forecast_run(dataset, engine):
+    """Store the forecasts of every district in ``dataset`` for one engine.
+
+    Returns the existing run when another worker already stored this
+    generation and engine.
+    """
+    engine = get_forecast_engine(engine).name
+    existing = ForecastRun.objects.filter(generation=dataset.generation, engine=engine).first()
+    if existing:
+        return existing
+
+    results = calculate_district_forecast(dataset, engine=engine)
+    district_ids = dict(
+        District.objects.filter(code__in=[row["distcode"] for row in results]).values_list("code", "id")
+    )
+
+    try:
+        with transaction.atomic():
+            run = ForecastRun.objects.create(generation=dataset.generation, engine=engine)
+            DistrictForecast.objects.bulk_create(
+                [
+                    DistrictForecast(
+                        run=run,
+                        district_id=district_ids[row["distcode"]],
+                        **{field: row[field] for field in FORECAST_FIELDS},
+                    )
+                    for row in results
+                    if row["distcode"] in district_ids
+                ]
+            )
+    except IntegrityError:
+        return ForecastRun.objects.get(generation=dataset.generation, engine=engine)
+
+    return run
+
+
+def refresh_forecast_runs():
+    """Compute every engine for the current data and drop runs of older generations."""
+    dataset = load_solar_excel()
+    for engine in FORECAST_ENGINES:
+        compute_forecast_run(dataset, engine)
+    ForecastRun.objects.filter(generation__lt=dataset.generation).delete()
+
+
+def _refresh_forecast_runs_thread():
+    try:
+        refresh_forecast_runs()
+    except Exception:
+        logger.exception("Background forecast refresh failed")
+    finally:
+        connection.close()
+
+
+def schedule_forecast_refresh():
+    """Recompute stored forecasts once the surrounding transaction commits."""
+    if not getattr(settings, "SOLAR_FORECAST_BACKGROUND", True):
+        transaction.on_commit(refresh_forecast_runs)
+        return
+
+    transaction.on_commit(
+        lambda: threading.Thread(target=_refresh_forecast_runs_thread, daemon=True).start()
+    )
+
+
+def get_district_forecasts(dataset, engine):
+    """Stored forecasts for ``dataset``'s generation, computing them if still missing."""
+    run = compute_forecast_run(dataset, engine)
+    rows = run.district_forecasts.values("district__code", "district__name", *FORECAST_FIELDS)
+    return [
+        {
+            "district": row.pop("district__name"),
+            "distcode": row.pop("district__code"),
+            "engine": run.engine,
+            **row,
+        }
+        for row in rows
+    ]
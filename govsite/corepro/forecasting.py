@@ -1,43 +1,193 @@
-from collections import defaultdict
+from dataclasses import dataclass
+
 import numpy as np
+from scipy import stats
 
-def calculate_district_forecast(data):
-    district_data = defaultdict(list)
 
-    for row in data:
-        if row["installed"] > 0:
-            district_data[row["district"]].append(row)
+# Two-sided coverage of the prediction interval reported by every engine
+PREDICTION_INTERVAL_LEVEL = 0.95
+
+HOLT_ALPHA = 0.5
+HOLT_BETA = 0.3
+RECENCY_DECAY = 0.6
+
+
+@dataclass(frozen=True)
+class ForecastEngine:
+    name: str
+    label: str
+    fit: object
+
+
+FORECAST_ENGINES = {}
+DEFAULT_FORECAST_ENGINE = "linear"
+
+
+def register_engine(name, label):
+    """Register ``fit(values, valid)`` as a forecasting engine.
+
+    ``values`` is a districts x steps float matrix whose valid cells are
+    packed to the left (``valid`` is a prefix mask per row). ``fit`` must work
+    on every row at once and return ``(slope, prediction, half_width)`` arrays,
+    with NaN half-widths where no interval can be estimated.
+    """
+    def decorator(fit):
+        FORECAST_ENGINES[name] = ForecastEngine(name, label, fit)
+        return fit
+    return decorator
+
+
+def get_forecast_engine(name):
+    return FORECAST_ENGINES.get(name) or FORECAST_ENGINES[DEFAULT_FORECAST_ENGINE]
+
+
+def installed_matrix(dataset, mask=None):
+    """Pack installed values into a districts x years matrix with a validity mask.
+
+    A cell is valid when the district has a row for that year with a positive
+    installed count, which is the subset the forecasts are fitted on.
+    """
+    values = dataset.district_year_sums("installed", mask).astype(np.float64)
+    valid = (dataset.district_year_counts(mask) > 0) & (values > 0)
+    return values, valid
+
+
+def pack_left(values, valid):
+    """Move each row's valid cells to the front, keeping their year order."""
+    order = np.argsort(~valid, axis=1, kind="stable")
+    packed_values = np.take_along_axis(values, order, axis=1)
+    packed_valid = np.take_along_axis(valid, order, axis=1)
+    return np.where(packed_valid, packed_values, 0.0), packed_valid
+
+
+def _t_quantile(degrees_of_freedom):
+    with np.errstate(invalid="ignore"):
+        df = np.where(degrees_of_freedom > 0, degrees_of_freedom, np.nan)
+        return stats.t.ppf(0.5 + PREDICTION_INTERVAL_LEVEL / 2, df)
 
-    forecast_results = []
 
-    for district, records in district_data.items():
+def _weighted_line(values, valid, weights):
+    """Weighted least-squares fit of every row against x = 1..n."""
+    x = np.cumsum(valid, axis=1) * valid
+    w = np.where(valid, weights, 0.0)
+    n = valid.sum(axis=1).astype(np.float64)
 
-        if len(records) < 2:
-            continue
+    sum_w = w.sum(axis=1)
+    sum_x = (w * x).sum(axis=1)
+    sum_y = (w * values).sum(axis=1)
+    sum_xx = (w * x * x).sum(axis=1)
+    sum_xy = (w * x * values).sum(axis=1)
 
-        records = sorted(records, key=lambda x: x["year"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (sum_w * sum_xy - sum_x * sum_y) / (sum_w * sum_xx - sum_x * sum_x)
+        intercept = (sum_y - slope * sum_x) / sum_w
 
-        years_index = list(range(1, len(records) + 1))
-        installed_values = [r["installed"] for r in records]
+        # Prediction interval at x0 = n + 1 with weights normalised to sum to n
+        residuals = np.where(valid, values - (intercept[:, None] + slope[:, None] * x), 0.0)
+        scale = n / sum_w
+        sse = (scale[:, None] * w * residuals * residuals).sum(axis=1)
+        sigma = np.sqrt(sse / (n - 2))
+        mean_x = sum_x / sum_w
+        spread_x = scale * (sum_xx - sum_w * mean_x * mean_x)
+        next_x = n + 1
+        half_width = _t_quantile(n - 2) * sigma * np.sqrt(1 + 1 / n + (next_x - mean_x) ** 2 / spread_x)
 
-        slope, intercept = np.polyfit(years_index, installed_values, 1)
+    prediction = intercept + slope * (n + 1)
+    return slope, prediction, np.where(n > 2, half_width, np.nan)
 
-        next_year_index = len(records) + 1
-        predicted_next = int(intercept + slope * next_year_index)
 
-        growth = (slope / installed_values[-1] * 100) if installed_values[-1] > 0 else 0
+@register_engine("linear", "Linear Trend")
+def fit_linear(values, valid):
+    """Ordinary least squares; the closed form of the old per-district polyfit."""
+    return _weighted_line(values, valid, 1.0)
+
+
+@register_engine("weighted", "Weighted Recent Trend")
+def fit_weighted_recent(values, valid):
+    """Least squares with weights decaying by ``RECENCY_DECAY`` per year of age."""
+    n = valid.sum(axis=1, keepdims=True)
+    age = n - np.cumsum(valid, axis=1)
+    return _weighted_line(values, valid, RECENCY_DECAY ** age)
+
+
+@register_engine("holt", "Holt Exponential Smoothing")
+def fit_holt(values, valid):
+    """Holt's linear exponential smoothing, stepping through years for all rows together."""
+    level = values[:, 0].copy()
+    trend = np.where(valid[:, 1], values[:, 1] - values[:, 0], 0.0) if values.shape[1] > 1 else np.zeros(len(values))
+    squared_errors = np.zeros(len(values))
+    error_count = np.zeros(len(values))
+
+    for step in range(1, values.shape[1]):
+        active = valid[:, step]
+        expected = level + trend
+        error = values[:, step] - expected
+        # The first step only seeds the trend, so its error is always zero
+        scored = active & (step > 1)
+        squared_errors += np.where(scored, error * error, 0.0)
+        error_count += scored
+
+        new_level = HOLT_ALPHA * values[:, step] + (1 - HOLT_ALPHA) * expected
+        new_trend = HOLT_BETA * (new_level - level) + (1 - HOLT_BETA) * trend
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.sqrt(squared_errors / error_count)
+        half_width = stats.norm.ppf(0.5 + PREDICTION_INTERVAL_LEVEL / 2) * sigma
+
+    return trend, level + trend, np.where(error_count > 0, half_width, np.nan)
+
+
+def calculate_district_forecast(dataset, mask=None, engine=DEFAULT_FORECAST_ENGINE):
+    engine = get_forecast_engine(engine)
+    values, valid = installed_matrix(dataset, mask)
+    if not values.size:
+        return []
+
+    packed_values, packed_valid = pack_left(values, valid)
+    n = packed_valid.sum(axis=1)
+    slope, prediction, half_width = engine.fit(packed_values, packed_valid)
+
+    num_years = valid.shape[1]
+    latest_pos = num_years - 1 - np.argmax(valid[:, ::-1], axis=1)
+    first_pos = np.argmax(valid, axis=1)
+    latest_installed = values[np.arange(len(values)), latest_pos]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(latest_installed > 0, slope / latest_installed * 100, 0)
+
+    # Keep the order the row-wise grouping produced: first year seen, then name
+    eligible = np.flatnonzero(n >= 2)
+    eligible = eligible[np.lexsort((eligible, first_pos[eligible]))]
+
+    forecast_results = []
+
+    for idx in eligible.tolist():
+        district_slope = float(slope[idx])
+        predicted_next = float(prediction[idx])
 
         risk = "Stable"
-        if slope < 0:
+        if district_slope < 0:
             risk = "High Risk"
-        elif slope > 50:
+        elif district_slope > 50:
             risk = "High Growth"
 
+        if np.isnan(half_width[idx]):
+            lower = upper = None
+        else:
+            lower = max(int(predicted_next - half_width[idx]), 0)
+            upper = max(int(predicted_next + half_width[idx]), 0)
+
         forecast_results.append({
-            "district": district,
-            "latest_year": records[-1]["year"],
-            "growth_rate": round(growth, 2),
-            "predicted_next_year_installed": max(predicted_next, 0),
+            "district": dataset.district_names[idx],
+            "distcode": dataset.district_codes[idx],
+            "latest_year": dataset.years[latest_pos[idx]],
+            "growth_rate": round(float(growth[idx]), 2),
+            "predicted_next_year_installed": max(int(predicted_next), 0),
+            "prediction_lower": lower,
+            "prediction_upper": upper,
+            "engine": engine.name,
             "risk_level": risk
         })
 
@@ -0,0 +1,290 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ImportJob, SolarDataUpload
+from .upload_preview import build_preview
+from .solar_data_service import (
+    import_solar_data_from_upload,
+    parse_upload_file,
+    replace_year_data,
+    upload_file_path,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# How imports run once their job is committed (settings.SOLAR_IMPORT_EXECUTOR):
+# "thread" hands them to an in-process pool, "command" leaves them queued for
+# the run_import_jobs management command, "inline" runs them in the request.
+DEFAULT_IMPORT_EXECUTOR = "thread"
+
+# Progress lives in the cache while the import transaction is still open,
+# because the job row itself is not visible to other connections until then.
+# The poll is served by whichever web worker gets it, and "command" imports
+# run in another process altogether, so CACHES must name a backend shared by
+# every process (see checks.check_import_progress_cache).
+PROGRESS_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a job may stay running before it is presumed lost with its worker
+# (settings.SOLAR_IMPORT_STALE_AFTER). A restart kills the thread pool
+# mid-import and rolls its transaction back, but leaves the job "running".
+DEFAULT_STALE_AFTER = 30 * 60
+
+STALE_JOB_ERROR = "The import was interrupted before it finished. Please upload the file again."
+
+_executor = {"pool": None}
+_executor_lock = threading.Lock()
+
+
+def progress_cache_key(job_id):
+    return f"corepro:import-job:{job_id}:rows"
+
+
+def get_executor():
+    with _executor_lock:
+        if _executor["pool"] is None:
+            _executor["pool"] = ThreadPoolExecutor(
+                max_workers=getattr(settings, "SOLAR_IMPORT_WORKERS", 1),
+                thread_name_prefix="solar-import",
+            )
+        return _executor["pool"]
+
+
+def enqueue_imports(uploads, user=None, replace=False):
+    """Create a queued job per upload and start them after the transaction commits.
+
+    With ``replace`` each job diffs its file against the year already stored
+    (see ``replace_year_data``) instead of requiring the year to be empty.
+    """
+    jobs = [
+        ImportJob.objects.create(
+            upload=upload,
+            original_filename=upload.original_filename,
+            year_label=upload.year_label,
+            replace_existing=replace,
+            created_by=user,
+        )
+        for upload in uploads
+    ]
+    job_ids = [job.pk for job in jobs]
+
+    executor = getattr(settings, "SOLAR_IMPORT_EXECUTOR", DEFAULT_IMPORT_EXECUTOR)
+    if executor == "inline":
+        transaction.on_commit(lambda: run_import_batch(job_ids))
+    elif executor == "thread":
+        transaction.on_commit(lambda: get_executor().submit(_run_import_batch_thread, job_ids))
+
+    return jobs
+
+
+def enqueue_import(upload, user=None, replace=False):
+    return enqueue_imports([upload], user, replace)[0]
+
+
+def claim_job(job_id):
+    """Move a queued job to running; False when another worker got it first."""
+    return bool(
+        ImportJob.objects.filter(pk=job_id, status=ImportJob.STATUS_QUEUED).update(
+            status=ImportJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+        )
+    )
+
+
+def _discard_upload(upload):
+    if upload is None:
+        return
+    upload.delete_file()
+    upload.delete()
+
+
+def fail_stale_jobs():
+    """Fail running jobs older than SOLAR_IMPORT_STALE_AFTER and return their ids.
+
+    Their uploads are discarded as for any failed import, so the year can be
+    uploaded again instead of staying blocked behind a job nobody is running.
+    """
+    stale_after = getattr(settings, "SOLAR_IMPORT_STALE_AFTER", DEFAULT_STALE_AFTER)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    failed = []
+    stale_jobs = ImportJob.objects.select_related("upload").filter(
+        status=ImportJob.STATUS_RUNNING,
+        started_at__lt=cutoff,
+    )
+    for job in stale_jobs:
+        # Conditional, in case the job finished since it was read
+        if not ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_RUNNING).update(
+            status=ImportJob.STATUS_FAILED,
+            error=STALE_JOB_ERROR,
+            upload=None,
+            finished_at=timezone.now(),
+        ):
+            continue
+        cache.delete(progress_cache_key(job.pk))
+        _discard_upload(job.upload)
+        failed.append(job.pk)
+    return failed
+
+
+def _execute_job(job, load_rows=None):
+    """Import a claimed job and record the outcome.
+
+    ``load_rows`` returns rows parsed elsewhere, or raises the parse error;
+    without it the file is streamed in this thread.
+    """
+    key = progress_cache_key(job.pk)
+
+    try:
+        if job.upload is None:
+            raise ValidationError("Uploaded file is missing.")
+        import_rows = replace_year_data if job.replace_existing else import_solar_data_from_upload
+        result = import_rows(
+            job.upload,
+            progress=lambda count: cache.set(key, count, PROGRESS_CACHE_TIMEOUT),
+            parsed_rows=load_rows() if load_rows else None,
+        )
+    except Exception as exc:
+        if isinstance(exc, ValidationError):
+            job.error = " ".join(exc.messages)
+        else:
+            logger.exception("Import job %s failed", job.pk)
+            job.error = "The file could not be imported because of an unexpected error."
+        # A failed import leaves no data behind, so drop the upload as well
+        # and let the user upload the corrected file again.
+        _discard_upload(job.upload)
+        job.upload = None
+        job.status = ImportJob.STATUS_FAILED
+    else:
+        if job.replace_existing:
+            job.rows_processed = result["rows"]
+            job.rows_created = result["created"]
+            job.rows_updated = result["updated"]
+            job.rows_deleted = result["deleted"]
+            # The year now matches this file, so it supersedes the earlier uploads
+            for previous in SolarDataUpload.objects.filter(year_label=job.year_label).exclude(pk=job.upload_id):
+                _discard_upload(previous)
+        else:
+            job.rows_processed = result
+        job.status = ImportJob.STATUS_SUCCEEDED
+    finally:
+        cache.delete(key)
+
+    if job.status == ImportJob.STATUS_SUCCEEDED:
+        # The preview page reads these artifacts instead of reopening the sheet.
+        # Without them it streams the sheet itself, so a failure here does not
+        # fail the import.
+        try:
+            build_preview(upload_file_path(job.upload))
+        except Exception:
+            logger.exception("Could not build the preview for import job %s", job.pk)
+
+    job.finished_at = timezone.now()
+    job.save(
+        update_fields=[
+            "upload",
+            "status",
+            "rows_processed",
+            "rows_created",
+            "rows_updated",
+            "rows_deleted",
+            "error",
+            "finished_at",
+        ]
+    )
+    return job
+
+
+def run_import_job(job_id):
+    """Run one queued job to completion. Returns the job, or None if it was already claimed."""
+    if not claim_job(job_id):
+        return None
+    return _execute_job(ImportJob.objects.select_related("upload").get(pk=job_id))
+
+
+def parse_process_count(file_count):
+    return max(1, min(file_count, getattr(settings, "SOLAR_IMPORT_PARSE_PROCESSES", os.cpu_count() or 1)))
+
+
+def run_import_batch(job_ids):
+    """Run several queued jobs, parsing their workbooks in parallel processes.
+
+    openpyxl parsing is CPU bound, so each file is parsed in its own worker
+    process. Every year is then written in its own transaction as soon as its
+    parse finishes, so one bad file only fails its own job. Returns the jobs
+    this call ran, in completion order.
+    """
+    claimed = [job_id for job_id in job_ids if claim_job(job_id)]
+    jobs = list(ImportJob.objects.select_related("upload").filter(pk__in=claimed).order_by("created_at"))
+
+    if len(jobs) < 2:
+        return [_execute_job(job) for job in jobs]
+
+    finished = []
+    to_parse = []
+    for job in jobs:
+        try:
+            path = upload_file_path(job.upload) if job.upload else None
+        except ValidationError:
+            path = None
+        if path is None:
+            # Fails straight away with the usual missing-file message
+            finished.append(_execute_job(job))
+        else:
+            to_parse.append((job, path))
+
+    if not to_parse:
+        return finished
+
+    # Spawned workers import Django afresh rather than forking a threaded web worker
+    with ProcessPoolExecutor(
+        max_workers=parse_process_count(len(to_parse)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    ) as pool:
+        futures = {
+            pool.submit(parse_upload_file, path, job.year_label): job
+            for job, path in to_parse
+        }
+        for future in as_completed(futures):
+            finished.append(_execute_job(futures[future], future.result))
+
+    return finished
+
+
+def _run_import_batch_thread(job_ids):
+    try:
+        run_import_batch(job_ids)
+    except Exception:
+        logger.exception("Background import of jobs %s crashed", job_ids)
+    finally:
+        connection.close()
+
+
+def job_progress(job):
+    """JSON-ready status of ``job``, with live row counts for running imports."""
+    rows_processed = job.rows_processed
+    if job.status == ImportJob.STATUS_RUNNING:
+        rows_processed = cache.get(progress_cache_key(job.pk), rows_processed)
+
+    return {
+        "id": job.pk,
+        "filename": job.original_filename,
+        "year_label": job.year_label,
+        "status": job.status,
+        "status_label": job.get_status_display(),
+        "rows_processed": rows_processed,
+        "change_summary": job.change_summary,
+        "error": job.error,
+        "finished": not job.is_active,
+    }
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from time import perf_counter
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from corepro.analytics import calculate_descriptive_metrics
+from corepro.dataloader import SolarDataset
+
+
+def synthetic_dataset(rows, districts=750, seed=0):
+    """Random dataset with ``rows`` records spread over ``districts`` districts."""
+    rng = np.random.default_rng(seed)
+    years_needed = -(-rows // districts)
+    years = [f"{2000 + offset}-{(1 + offset) % 100:02d}" for offset in range(years_needed)]
+
+    district_idx = np.arange(rows) % districts
+    year_idx = np.arange(rows) // districts
+    booking = rng.integers(0, 2000, rows)
+    metrics = {
+        "target": rng.integers(0, 2500, rows),
+        "booking": booking,
+        "installed": rng.integers(0, booking + 1),
+        "rejected": rng.integers(0, booking // 4 + 1),
+    }
+    return SolarDataset(
+        [str(100 + idx) for idx in range(districts)],
+        [f"District {idx:04d}" for idx in range(districts)],
+        years,
+        district_idx,
+        year_idx,
+        metrics,
+    )
+
+
+def legacy_descriptive_metrics(data):
+    """Row-by-row implementation the vectorized version replaced, kept as the reference."""
+    district_data = defaultdict(list)
+
+    for row in data:
+        district_data[row["district"]].append(row)
+
+    results = []
+
+    for district, records in district_data.items():
+        total_eff = 0
+        total_target_rate = 0
+        total_rejection = 0
+        count = 0
+
+        for r in records:
+            if r["booking"] > 0:
+                eff = r["installed"] / r["booking"]
+                rejection = r["rejected"] / r["booking"]
+            else:
+                eff = 0
+                rejection = 0
+
+            if r["target"] > 0:
+                target_rate = r["installed"] / r["target"]
+            else:
+                target_rate = 0
+
+            total_eff += eff
+            total_target_rate += target_rate
+            total_rejection += rejection
+            count += 1
+
+        avg_eff = total_eff / count if count else 0
+        avg_target_rate = total_target_rate / count if count else 0
+        avg_rejection = total_rejection / count if count else 0
+
+        score = (0.4 * avg_eff) + (0.4 * avg_target_rate) + (0.2 * (1 - avg_rejection))
+
+        if score >= 0.75:
+            category = "High"
+        elif score >= 0.55:
+            category = "Moderate"
+        else:
+            category = "Low"
+
+        results.append({
+            "district": district,
+            "avg_efficiency": round(avg_eff, 3),
+            "avg_target_rate": round(avg_target_rate, 3),
+            "avg_rejection": round(avg_rejection, 3),
+            "score": round(score, 3),
+            "category": category
+        })
+
+    return sorted(results, key=lambda x: x["score"], reverse=True)
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = perf_counter()
+        result = func()
+        timings.append(perf_counter() - started)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = "Compare the vectorized descriptive metrics with the row-by-row reference."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for rows in options["rows"]:
+            dataset = synthetic_dataset(rows)
+            legacy_rows = list(dataset.iter_rows())
+
+            legacy_time, expected = best_time(lambda: legacy_descriptive_metrics(legacy_rows), options["repeat"])
+            vector_time, actual = best_time(lambda: calculate_descriptive_metrics(dataset), options["repeat"])
+
+            if actual != expected:
+                raise CommandError(f"Vectorized output differs from the reference at {rows} rows.")
+
+            self.stdout.write(
+                f"{rows:>9,} rows  legacy {legacy_time * 1000:8.2f} ms  "
+                f"vectorized {vector_time * 1000:8.2f} ms  speedup {legacy_time / vector_time:6.1f}x"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Vectorized output matches the reference."))
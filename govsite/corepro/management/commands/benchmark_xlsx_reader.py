@@ -0,0 +1,78 @@
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from openpyxl import Workbook
+
+from corepro.solar_data_service import iter_upload_rows
+from corepro.xlsx_reader import open_sheet
+
+from .benchmark_descriptive_metrics import best_time
+
+
+def scaled_workbook(sources, rows, target_path):
+    """Write ``rows`` data rows cycled from the ``sources`` workbooks, with unique district codes."""
+    header = None
+    sample_rows = []
+    for source in sources:
+        with open_sheet(source, reader="openpyxl") as sheet:
+            source_rows = sheet.rows()
+            source_header = next(source_rows, None)
+            header = header or source_header
+            sample_rows.extend(row for row in source_rows if row and row[0] is not None)
+
+    if not sample_rows:
+        raise CommandError("The sample workbooks contain no data rows.")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for offset in range(rows):
+        row = list(sample_rows[offset % len(sample_rows)])
+        row[0] = 1000 + offset
+        sheet.append(row)
+    workbook.save(target_path)
+
+
+class Command(BaseCommand):
+    help = "Compare the streaming xlsx reader with openpyxl on the sample uploads, scaled up."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--source",
+            required=True,
+            help="Directory holding SolarPumpData_YYYY-YY.xlsx samples, such as corepro/data.",
+        )
+
+    def handle(self, *args, **options):
+        sources = sorted(Path(options["source"]).glob("SolarPumpData_*.xlsx"))
+        if not sources:
+            raise CommandError(f"No SolarPumpData_*.xlsx files found in {options['source']}.")
+
+        year_label = "2024-25"
+        with tempfile.TemporaryDirectory() as workdir:
+            for rows in options["rows"]:
+                path = Path(workdir) / f"SolarPumpData_{year_label}.xlsx"
+                scaled_workbook(sources, rows, path)
+
+                timings = {}
+                results = {}
+                for reader in ("openpyxl", "fast"):
+                    with override_settings(SOLAR_XLSX_READER=reader):
+                        timings[reader], results[reader] = best_time(
+                            lambda: list(iter_upload_rows(path, year_label)), options["repeat"]
+                        )
+
+                if results["fast"] != results["openpyxl"]:
+                    raise CommandError(f"The fast reader's rows differ from openpyxl's at {rows} rows.")
+
+                self.stdout.write(
+                    f"{rows:>9,} rows  openpyxl {timings['openpyxl'] * 1000:9.1f} ms  "
+                    f"fast {timings['fast'] * 1000:9.1f} ms  "
+                    f"speedup {timings['openpyxl'] / timings['fast']:5.1f}x"
+                )
+
+        self.stdout.write(self.style.SUCCESS("The fast reader matches openpyxl."))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from corepro.import_jobs import fail_stale_jobs, run_import_batch
+from corepro.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = "Run queued solar data import jobs, parsing several workbooks in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new jobs instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            for job_id in fail_stale_jobs():
+                self.stdout.write(self.style.WARNING(f"Import job {job_id} was left running and has been failed."))
+
+            queued = list(
+                ImportJob.objects.filter(status=ImportJob.STATUS_QUEUED)
+                .order_by("created_at")
+                .values_list("pk", flat=True)
+            )
+            for job in run_import_batch(queued):
+                if job.status == ImportJob.STATUS_SUCCEEDED:
+                    self.stdout.write(f"{job.original_filename}: imported {job.rows_processed} rows.")
+                else:
+                    self.stdout.write(self.style.ERROR(f"{job.original_filename}: {job.error}"))
+
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
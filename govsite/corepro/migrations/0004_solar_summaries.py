@@ -0,0 +1,96 @@
+# Generated by Django 6.0 on 2026-10-18 13:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+METRIC_FIELDS = ("target", "booking", "installed", "rejected")
+
+
+def build_summaries(apps, schema_editor):
+    SolarYearData = apps.get_model("corepro", "SolarYearData")
+    SolarYearSummary = apps.get_model("corepro", "SolarYearSummary")
+    SolarDistrictSummary = apps.get_model("corepro", "SolarDistrictSummary")
+    metric_sums = {metric: Sum(metric) for metric in METRIC_FIELDS}
+
+    year_rows = (
+        SolarYearData.objects.values("year_label")
+        .annotate(district_count=Count("id"), **metric_sums)
+        .order_by()
+    )
+    SolarYearSummary.objects.bulk_create([SolarYearSummary(**row) for row in year_rows])
+
+    district_rows = (
+        SolarYearData.objects.values("district_id")
+        .annotate(year_count=Count("id"), **metric_sums)
+        .order_by()
+    )
+    SolarDistrictSummary.objects.bulk_create(
+        [SolarDistrictSummary(**row) for row in district_rows]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("corepro", "0003_solardatageneration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SolarYearSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year_label", models.CharField(max_length=7, unique=True)),
+                ("district_count", models.PositiveIntegerField(default=0)),
+                ("target", models.PositiveBigIntegerField(default=0)),
+                ("booking", models.PositiveBigIntegerField(default=0)),
+                ("installed", models.PositiveBigIntegerField(default=0)),
+                ("rejected", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["year_label"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SolarDistrictSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year_count", models.PositiveIntegerField(default=0)),
+                ("target", models.PositiveBigIntegerField(default=0)),
+                ("booking", models.PositiveBigIntegerField(default=0)),
+                ("installed", models.PositiveBigIntegerField(default=0)),
+                ("rejected", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "district",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="solar_summary",
+                        to="corepro.district",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["district__name"],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
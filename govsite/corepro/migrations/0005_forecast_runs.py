@@ -0,0 +1,90 @@
+# Generated by Django 6.0 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("corepro", "0004_solar_summaries"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ForecastRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("generation", models.PositiveBigIntegerField()),
+                ("engine", models.CharField(max_length=20)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["-generation", "engine"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("generation", "engine"),
+                        name="unique_generation_engine_forecast_run",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DistrictForecast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("latest_year", models.CharField(max_length=7)),
+                ("growth_rate", models.FloatField()),
+                ("predicted_next_year_installed", models.PositiveIntegerField()),
+                (
+                    "prediction_lower",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "prediction_upper",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                ("risk_level", models.CharField(max_length=20)),
+                (
+                    "district",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="forecasts",
+                        to="corepro.district",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="district_forecasts",
+                        to="corepro.forecastrun",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-predicted_next_year_installed"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run", "district"), name="unique_run_district_forecast"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("corepro", "0006_import_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="replace_existing",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="rows_created",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="rows_deleted",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="rows_updated",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 13:42
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_uploads(apps, schema_editor):
+    # Files already stored keep their paths; only the hash is recorded
+    SolarDataUpload = apps.get_model("corepro", "SolarDataUpload")
+    for upload in SolarDataUpload.objects.exclude(file=""):
+        if not upload.file.storage.exists(upload.file.name):
+            continue
+        digest = hashlib.sha256()
+        with upload.file.open("rb") as handle:
+            for chunk in handle.chunks():
+                digest.update(chunk)
+        upload.content_sha256 = digest.hexdigest()
+        upload.save(update_fields=["content_sha256"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("corepro", "0007_import_job_replace"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="solardataupload",
+            name="content_sha256",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.RunPython(hash_existing_uploads, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,39 @@
+import hashlib
 import re
 from pathlib import Path
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+from .upload_preview import delete_preview
+
+
+def file_sha256(file):
+	"""Hex SHA-256 of a Django ``File``, read in its usual chunks."""
+	digest = hashlib.sha256()
+	for chunk in file.chunks():
+		digest.update(chunk)
+	return digest.hexdigest()
 
 
 def solar_upload_path(instance, filename):
+	# Uploads are stored under their content hash, so an identical file is
+	# kept once however many times it is uploaded.
+	if instance.content_sha256:
+		sha = instance.content_sha256
+		return f"solar_uploads/{sha[:2]}/{sha}{Path(filename).suffix.lower()}"
 	return f"solar_uploads/{filename}"
 
 
 class SolarDataUpload(models.Model):
-	FILE_NAME_PATTERN = re.compile(r"^SolarPumpData_\d{4}-\d{2}\.xlsx$")
+	FILE_NAME_PATTERN = re.compile(r"^SolarPumpData_\d{4}-\d{2}\.(xlsx|csv|tsv|parquet)$")
 
 	file = models.FileField(upload_to=solar_upload_path)
 	original_filename = models.CharField(max_length=255)
 	year_label = models.CharField(max_length=7)
+	content_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
 	uploaded_by = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
 		on_delete=models.SET_NULL,
@@ -34,7 +53,8 @@ class SolarDataUpload(models.Model):
 	def validate_filename(cls, filename):
 		if not cls.FILE_NAME_PATTERN.match(filename):
 			raise ValidationError(
-				"File name must follow this format: SolarPumpData_YYYY-YY.xlsx"
+				"File name must follow this format: SolarPumpData_YYYY-YY.xlsx "
+				"(.csv, .tsv and .parquet files are accepted too)"
 			)
 
 	@staticmethod
@@ -51,8 +71,85 @@ class SolarDataUpload(models.Model):
 		if self.file and not self.original_filename:
 			self.original_filename = Path(self.file.name).name
 		self.full_clean()
+
+		if self.file and not self.file._committed:
+			if not self.content_sha256:
+				self.content_sha256 = file_sha256(self.file)
+			stored_name = solar_upload_path(self, self.original_filename)
+			if self.file.storage.exists(stored_name):
+				# Same content as a file already stored; point at it instead of copying
+				self.file = stored_name
 		super().save(*args, **kwargs)
 
+	def delete_file(self):
+		"""Delete the stored file unless another upload shares it."""
+		if not self.file:
+			return
+		if not SolarDataUpload.objects.filter(file=self.file.name).exclude(pk=self.pk).exists():
+			delete_preview(self.file.path)
+			self.file.delete(save=False)
+
+
+class ImportJob(models.Model):
+	"""Background import of one ``SolarDataUpload`` into ``SolarYearData``."""
+
+	STATUS_QUEUED = "queued"
+	STATUS_RUNNING = "running"
+	STATUS_SUCCEEDED = "succeeded"
+	STATUS_FAILED = "failed"
+	STATUS_CHOICES = [
+		(STATUS_QUEUED, "Queued"),
+		(STATUS_RUNNING, "Running"),
+		(STATUS_SUCCEEDED, "Succeeded"),
+		(STATUS_FAILED, "Failed"),
+	]
+	ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+	upload = models.ForeignKey(
+		SolarDataUpload,
+		on_delete=models.SET_NULL,
+		null=True,
+		blank=True,
+		related_name="import_jobs",
+	)
+	original_filename = models.CharField(max_length=255)
+	year_label = models.CharField(max_length=7)
+	status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+	rows_processed = models.PositiveIntegerField(default=0)
+	# Replace mode diffs the file against the stored year instead of
+	# refusing a year that already has data.
+	replace_existing = models.BooleanField(default=False)
+	rows_created = models.PositiveIntegerField(default=0)
+	rows_updated = models.PositiveIntegerField(default=0)
+	rows_deleted = models.PositiveIntegerField(default=0)
+	error = models.TextField(blank=True)
+	created_by = models.ForeignKey(
+		settings.AUTH_USER_MODEL,
+		on_delete=models.SET_NULL,
+		null=True,
+		blank=True,
+		related_name="solar_import_jobs",
+	)
+	created_at = models.DateTimeField(auto_now_add=True)
+	started_at = models.DateTimeField(null=True, blank=True)
+	finished_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		ordering = ["-created_at"]
+
+	def __str__(self):
+		return f"Import {self.original_filename} ({self.status})"
+
+	@property
+	def is_active(self):
+		return self.status in self.ACTIVE_STATUSES
+
+	@property
+	def change_summary(self):
+		if not self.replace_existing or self.status != self.STATUS_SUCCEEDED:
+			return ""
+		return f"{self.rows_created} added, {self.rows_updated} changed, {self.rows_deleted} removed"
+
 
 class District(models.Model):
 	code = models.CharField(max_length=20, unique=True)
@@ -92,3 +189,114 @@ class SolarYearData(models.Model):
 
 	def __str__(self):
 		return f"{self.district.name} - {self.year_label}"
+
+
+class SolarYearSummary(models.Model):
+	year_label = models.CharField(max_length=7, unique=True)
+	district_count = models.PositiveIntegerField(default=0)
+	target = models.PositiveBigIntegerField(default=0)
+	booking = models.PositiveBigIntegerField(default=0)
+	installed = models.PositiveBigIntegerField(default=0)
+	rejected = models.PositiveBigIntegerField(default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		ordering = ["year_label"]
+
+	def __str__(self):
+		return f"Summary {self.year_label}"
+
+
+class SolarDistrictSummary(models.Model):
+	district = models.OneToOneField(
+		District,
+		on_delete=models.CASCADE,
+		related_name="solar_summary",
+	)
+	year_count = models.PositiveIntegerField(default=0)
+	target = models.PositiveBigIntegerField(default=0)
+	booking = models.PositiveBigIntegerField(default=0)
+	installed = models.PositiveBigIntegerField(default=0)
+	rejected = models.PositiveBigIntegerField(default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		ordering = ["district__name"]
+
+	def __str__(self):
+		return f"Summary {self.district.name}"
+
+
+class ForecastRun(models.Model):
+	generation = models.PositiveBigIntegerField()
+	engine = models.CharField(max_length=20)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ["-generation", "engine"]
+		constraints = [
+			models.UniqueConstraint(
+				fields=["generation", "engine"],
+				name="unique_generation_engine_forecast_run",
+			)
+		]
+
+	def __str__(self):
+		return f"{self.engine} forecast (generation {self.generation})"
+
+
+class DistrictForecast(models.Model):
+	run = models.ForeignKey(
+		ForecastRun,
+		on_delete=models.CASCADE,
+		related_name="district_forecasts",
+	)
+	district = models.ForeignKey(
+		District,
+		on_delete=models.CASCADE,
+		related_name="forecasts",
+	)
+	latest_year = models.CharField(max_length=7)
+	growth_rate = models.FloatField()
+	predicted_next_year_installed = models.PositiveIntegerField()
+	prediction_lower = models.PositiveIntegerField(null=True, blank=True)
+	prediction_upper = models.PositiveIntegerField(null=True, blank=True)
+	risk_level = models.CharField(max_length=20)
+
+	class Meta:
+		ordering = ["-predicted_next_year_installed"]
+		constraints = [
+			models.UniqueConstraint(
+				fields=["run", "district"],
+				name="unique_run_district_forecast",
+			)
+		]
+
+	def __str__(self):
+		return f"{self.district.name} - {self.run}"
+
+
+class SolarDataGeneration(models.Model):
+	"""Single-row counter bumped whenever stored solar data changes."""
+
+	SINGLETON_ID = 1
+
+	value = models.PositiveBigIntegerField(default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	def __str__(self):
+		return f"Solar data generation {self.value}"
+
+	@classmethod
+	def current(cls):
+		value = cls.objects.filter(pk=cls.SINGLETON_ID).values_list("value", flat=True).first()
+		return value or 0
+
+	@classmethod
+	def bump(cls):
+		cls.objects.get_or_create(pk=cls.SINGLETON_ID)
+		cls.objects.filter(pk=cls.SINGLETON_ID).update(
+			value=F("value") + 1,
+			updated_at=timezone.now(),
+		)
+		return cls.current()
@@ -0,0 +1,151 @@
+import threading
+
+import numpy as np
+
+from .dataloader import METRIC_FIELDS
+from .stats_summary import spread_statistics
+
+
+def combine_moments(left, right):
+    """Merge two ``(count, mean, M2, M3)`` partials element-wise.
+
+    ``M2`` and ``M3`` are sums of squared and cubed deviations from the
+    partial's own mean. This is the pairwise update of Chan et al. extended
+    to the third moment by Pébay; unlike rebuilding the moments from raw power
+    sums it does not lose precision when the mean is large next to the spread.
+    """
+    n_a, mean_a, m2_a, m3_a = left
+    n_b, mean_b, m2_b, m3_b = right
+    n = n_a + n_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = mean_b - mean_a
+        delta_n = np.where(n > 0, delta / n, 0.0)
+        mean = mean_a + delta_n * n_b
+        m2 = m2_a + m2_b + delta * delta_n * n_a * n_b
+        m3 = (
+            m3_a + m3_b
+            + delta * delta_n * delta_n * n_a * n_b * (n_a - n_b)
+            + 3 * delta_n * (n_a * m2_b - n_b * m2_a)
+        )
+    return n, mean, m2, m3
+
+
+class SolarPartials:
+    """Per-(district, year) partial aggregates of a ``SolarDataset``.
+
+    For every metric the cell holds the exact sum next to the centred moments
+    ``(mean, M2, M3)`` of its rows, plus a row count, so any subset of years
+    can be answered by combining the selected cells (see ``merge``).
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        counts = dataset.district_year_counts()
+        self.counts = counts.astype(np.float64)
+        cells = dataset.district_idx * dataset.num_years + dataset.year_idx
+
+        self.sums = {}
+        self.moments = {}
+        for metric in METRIC_FIELDS:
+            values = dataset[metric].astype(np.float64)
+            sums = dataset.district_year_totals(values)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                means = np.where(counts > 0, sums / counts, 0.0)
+            deviations = values - means.ravel()[cells]
+            self.sums[metric] = sums
+            self.moments[metric] = (
+                means,
+                dataset.district_year_totals(deviations ** 2),
+                dataset.district_year_totals(deviations ** 3),
+            )
+
+    def year_positions(self, years=None):
+        if years is None:
+            return np.arange(self.dataset.num_years)
+        positions = {year: idx for idx, year in enumerate(self.dataset.years)}
+        return np.array([positions[year] for year in years if year in positions], dtype=np.int64)
+
+    def merge(self, years=None):
+        selected = np.zeros(self.counts.shape, dtype=bool)
+        selected[:, self.year_positions(years)] = True
+        return self.merge_cells(selected)
+
+    def merge_cells(self, selected):
+        """Merge the cells where the district x year mask ``selected`` is set, per district."""
+        counts = np.where(selected, self.counts, 0.0)
+        sums = {metric: np.where(selected, cube, 0.0).sum(axis=1) for metric, cube in self.sums.items()}
+
+        moments = {}
+        for metric, (means, m2, m3) in self.moments.items():
+            merged = tuple(np.zeros(len(counts)) for _ in range(4))
+            for column in range(counts.shape[1]):
+                keep = selected[:, column]
+                cell = (
+                    counts[:, column],
+                    means[:, column],
+                    np.where(keep, m2[:, column], 0.0),
+                    np.where(keep, m3[:, column], 0.0),
+                )
+                merged = combine_moments(merged, cell)
+            moments[metric] = merged[1:]
+
+        return MergedPartials(self.dataset, counts.sum(axis=1), sums, moments)
+
+
+class MergedPartials:
+    """Per-district moments for one merged subset of years."""
+
+    def __init__(self, dataset, counts, sums, moments):
+        self.dataset = dataset
+        self.counts = counts
+        self.sums = sums
+        self.moments = moments
+
+    @property
+    def present(self):
+        return self.counts > 0
+
+    def totals(self, metric):
+        return np.rint(self.sums[metric]).astype(np.int64)
+
+    def mean(self, metric):
+        return np.where(self.counts > 0, self.moments[metric][0], np.nan)
+
+    def spread(self, metric):
+        """Per-district ``(stdev, cv, skewness)`` arrays from the merged moments."""
+        n = self.counts
+        mean, m2, m3 = self.moments[metric]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(n > 0, mean, np.nan)
+            return spread_statistics(n, mean, m2 / n, m3 / n)
+
+    def sample_stdev(self, metric):
+        return self.spread(metric)[0]
+
+    def coefficient_of_variation(self, metric):
+        """Sample CV in percent; NaN where fewer than two values or a zero mean."""
+        return self.spread(metric)[1]
+
+    def skewness(self, metric):
+        """Biased sample skewness (``scipy.stats.skew`` default); NaN below three values
+        or when the values are constant."""
+        return self.spread(metric)[2]
+
+
+_partials_cache = {"dataset": None, "partials": None}
+_partials_cache_lock = threading.Lock()
+
+
+def get_solar_partials(dataset):
+    """Return the partials for ``dataset``, reusing them while the dataset is cached."""
+    with _partials_cache_lock:
+        if _partials_cache["dataset"] is dataset:
+            return _partials_cache["partials"]
+
+    partials = SolarPartials(dataset)
+
+    with _partials_cache_lock:
+        _partials_cache["dataset"] = dataset
+        _partials_cache["partials"] = partials
+
+    return partials
@@ -1,13 +1,27 @@
+from itertools import islice
 from pathlib import Path
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from openpyxl import load_workbook
+from django.db.models import Count, Sum
+from django.utils import timezone
 
-from .models import District, SolarYearData
+from .dataloader import METRIC_FIELDS
+from .forecast_runs import schedule_forecast_refresh
+from .models import (
+    District,
+    SolarDataGeneration,
+    SolarDistrictSummary,
+    SolarYearData,
+    SolarYearSummary,
+)
+from .upload_formats import open_upload
 
 
 TOTAL_ROW_MARKERS = {"total", "grand total", "overall"}
 
+# Rows parsed and inserted per round trip during an import
+IMPORT_BATCH_SIZE = 2000
+
 
 def normalize_header(value):
     return str(value or "").strip().lower().replace(" ", "")
@@ -66,16 +80,17 @@ def resolve_metric_column(header_map, metric_name, year_label):
     return None
 
 
-def parse_upload_rows(file_path, year_label):
-    workbook = load_workbook(file_path, read_only=True, data_only=True)
-    sheet = workbook.active
-    rows = list(sheet.iter_rows(values_only=True))
-
-    if not rows:
-        return []
+def sniff_header(header_row, year_label):
+    """Map the header row of an upload to column positions.
 
-    header_row = [normalize_header(value) for value in rows[0]]
-    header_map = {header: idx for idx, header in enumerate(header_row) if header}
+    Returns ``{"district_code": idx, "district_name": idx, <metric>: idx, ...}``
+    and raises ``ValidationError`` when a required column is missing.
+    """
+    header_map = {
+        header: idx
+        for idx, header in enumerate(normalize_header(value) for value in header_row)
+        if header
+    }
 
     district_code_idx = header_map.get("distcode")
     if district_code_idx is None:
@@ -86,88 +101,312 @@ def parse_upload_rows(file_path, year_label):
         district_name_idx = header_map.get("districtname")
 
     if district_code_idx is None or district_name_idx is None:
-        raise ValidationError("Excel format is invalid. Distcode and District columns are required.")
+        raise ValidationError("File format is invalid. Distcode and District columns are required.")
 
-    target_idx = resolve_metric_column(header_map, "target", year_label)
-    booking_idx = resolve_metric_column(header_map, "booking", year_label)
-    installed_idx = resolve_metric_column(header_map, "installed", year_label)
-    rejected_idx = resolve_metric_column(header_map, "rejected", year_label)
+    columns = {"district_code": district_code_idx, "district_name": district_name_idx}
+    for metric in METRIC_FIELDS:
+        columns[metric] = resolve_metric_column(header_map, metric, year_label)
 
-    if None in (target_idx, booking_idx, installed_idx, rejected_idx):
-        raise ValidationError("Excel format is invalid. Target, Booking, installed, and Rejected columns are required.")
+    if any(columns[metric] is None for metric in METRIC_FIELDS):
+        raise ValidationError("File format is invalid. Target, Booking, installed, and Rejected columns are required.")
 
-    parsed_rows = []
+    return columns
 
-    for row in rows[1:]:
-        district_code = normalize_district_code(row[district_code_idx] if district_code_idx < len(row) else "")
-        district_name = str(row[district_name_idx] if district_name_idx < len(row) else "").strip()
 
-        if not district_code or not district_name:
-            continue
+def parse_upload_row(row, columns):
+    """Parse one data row, or return None for blank and total rows."""
+    def cell(name, default):
+        idx = columns[name]
+        return row[idx] if idx < len(row) else default
 
-        if district_name.lower() in TOTAL_ROW_MARKERS:
-            continue
+    district_code = normalize_district_code(cell("district_code", ""))
+    district_name = str(cell("district_name", "")).strip()
+
+    if not district_code or not district_name:
+        return None
+
+    if district_name.lower() in TOTAL_ROW_MARKERS:
+        return None
+
+    parsed = {"district_code": district_code, "district_name": district_name}
+    for metric in METRIC_FIELDS:
+        parsed[metric] = parse_int(cell(metric, 0))
+    return parsed
+
+
+def iter_upload_rows(file_path, year_label):
+    """Yield parsed district rows from an xlsx, csv, tsv or parquet upload without loading it whole."""
+    with open_upload(file_path) as sheet:
+        rows = sheet.rows()
+        header_row = next(rows, None)
+        rows.close()
+        if header_row is None:
+            return
+
+        # Only the six columns the import uses are decoded from here on
+        columns = sniff_header(header_row, year_label)
+        needed = sorted(set(columns.values()))
+        positions = {name: needed.index(idx) for name, idx in columns.items()}
+        for row in sheet.rows(columns=needed, min_row=2):
+            parsed = parse_upload_row(row, positions)
+            if parsed is not None:
+                yield parsed
+
+
+def parse_upload_rows(file_path, year_label):
+    return sorted(iter_upload_rows(file_path, year_label), key=lambda item: item["district_name"].lower())
 
-        parsed_rows.append(
-            {
-                "district_code": district_code,
-                "district_name": district_name,
-                "target": parse_int(row[target_idx] if target_idx < len(row) else 0),
-                "booking": parse_int(row[booking_idx] if booking_idx < len(row) else 0),
-                "installed": parse_int(row[installed_idx] if installed_idx < len(row) else 0),
-                "rejected": parse_int(row[rejected_idx] if rejected_idx < len(row) else 0),
-            }
-        )
 
-    return sorted(parsed_rows, key=lambda item: item["district_name"].lower())
+def parse_upload_file(file_path, year_label):
+    """Parse a whole upload into a list, for worker processes that hand their rows back."""
+    return list(iter_upload_rows(file_path, year_label))
 
 
-def import_solar_data_from_upload(upload):
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def upsert_districts(rows):
+    """Create or rename the districts named in ``rows`` and return them by code.
+
+    Uses one lookup, one upsert and one update however many rows there are;
+    when a code appears more than once the last name wins.
+    """
+    names = {row["district_code"]: row["district_name"] for row in rows}
+    districts = District.objects.in_bulk(list(names), field_name="code")
+
+    missing = [District(code=code, name=name) for code, name in names.items() if code not in districts]
+    renamed = []
+    for code, district in districts.items():
+        if district.name != names[code]:
+            district.name = names[code]
+            district.updated_at = timezone.now()
+            renamed.append(district)
+
+    # Another import may add the same new code between the lookup and the
+    # insert; the conflict clause turns that insert into a rename.
+    District.objects.bulk_create(
+        missing,
+        update_conflicts=True,
+        unique_fields=["code"],
+        update_fields=["name", "updated_at"],
+    )
+    District.objects.bulk_update(renamed, ["name", "updated_at"])
+
+    districts.update((district.code, district) for district in missing)
+    return districts
+
+
+def upload_file_path(upload):
     if not upload.file:
         raise ValidationError("Uploaded file is missing.")
 
-    if SolarYearData.objects.filter(year_label=upload.year_label).exists():
-        raise ValidationError(
-            f"Data for {upload.year_label} already exists. Delete that upload before importing again."
-        )
-
     file_name = upload.file.name
     storage = upload.file.storage
 
     if not storage.exists(file_name):
         raise ValidationError("Uploaded file not found in storage.")
 
-    parsed_rows = parse_upload_rows(Path(storage.path(file_name)), upload.year_label)
+    return Path(storage.path(file_name))
+
 
-    if not parsed_rows:
-        raise ValidationError("No district rows found to import in this file.")
+def import_solar_data_from_upload(upload, batch_size=IMPORT_BATCH_SIZE, progress=None, parsed_rows=None):
+    if parsed_rows is None and not upload.file:
+        raise ValidationError("Uploaded file is missing.")
 
+    if SolarYearData.objects.filter(year_label=upload.year_label).exists():
+        raise ValidationError(
+            f"Data for {upload.year_label} already exists. Delete that upload before importing again."
+        )
+
+    # Callers that parsed the file elsewhere (see import_jobs.run_import_batch)
+    # pass the rows in; otherwise they are streamed from the stored file.
+    if parsed_rows is None:
+        parsed_rows = iter_upload_rows(upload_file_path(upload), upload.year_label)
+
+    imported_count = 0
+    district_ids = set()
+
+    # Rows are parsed and written one chunk at a time, so memory stays bounded
+    # by batch_size however large the sheet is. A ValidationError raised part
+    # way through rolls the whole year back. ``progress``, when given, is called
+    # with the running row count after every chunk.
     with transaction.atomic():
-        batch = []
-        for item in parsed_rows:
-            district, _ = District.objects.get_or_create(
-                code=item["district_code"], defaults={"name": item["district_name"]}
-            )
-            if district.name != item["district_name"]:
-                district.name = item["district_name"]
-                district.save(update_fields=["name", "updated_at"])
-
-            batch.append(
+        for chunk in chunked(parsed_rows, batch_size):
+            districts = upsert_districts(chunk)
+            batch = [
                 SolarYearData(
-                    district=district,
+                    district=districts[item["district_code"]],
                     year_label=upload.year_label,
                     target=item["target"],
                     booking=item["booking"],
                     installed=item["installed"],
                     rejected=item["rejected"],
                 )
-            )
+                for item in chunk
+            ]
+
+            SolarYearData.objects.bulk_create(batch, batch_size=batch_size)
+            district_ids.update(row.district_id for row in batch)
+            imported_count += len(batch)
+            if progress is not None:
+                progress(imported_count)
 
-        SolarYearData.objects.bulk_create(batch)
+        if not imported_count:
+            raise ValidationError("No district rows found to import in this file.")
 
-    return len(batch)
+        refresh_solar_summaries([upload.year_label], district_ids)
+        SolarDataGeneration.bump()
+        schedule_forecast_refresh()
+
+    return imported_count
+
+
+def replace_year_data(upload, batch_size=IMPORT_BATCH_SIZE, progress=None, parsed_rows=None):
+    """Bring a year's stored rows in line with ``upload`` by writing only the differences.
+
+    Districts missing from the year are inserted, those whose metrics differ
+    are updated and those no longer in the file are deleted, all in one
+    transaction, so the dashboards never see the year half replaced. Returns
+    ``{"rows", "created", "updated", "deleted", "unchanged"}`` counts. When a
+    district appears twice in the file the last row wins.
+    """
+    if parsed_rows is None and not upload.file:
+        raise ValidationError("Uploaded file is missing.")
+
+    if parsed_rows is None:
+        parsed_rows = iter_upload_rows(upload_file_path(upload), upload.year_label)
+
+    row_count = 0
+    seen = set()
+    created_ids = set()
+    updated_ids = set()
+    renamed_ids = set()
+
+    with transaction.atomic():
+        year_rows = SolarYearData.objects.filter(year_label=upload.year_label)
+        locked_rows = year_rows.select_related("district").select_for_update(of=("self",))
+        existing = {row.district_id: row for row in locked_rows}
+
+        for chunk in chunked(parsed_rows, batch_size):
+            districts = upsert_districts(chunk)
+            to_create = {}
+            to_update = {}
+            for item in chunk:
+                district = districts[item["district_code"]]
+                seen.add(district.pk)
+                row = existing.get(district.pk)
+                if row is not None and row.district.name != item["district_name"]:
+                    renamed_ids.add(district.pk)
+                if row is None:
+                    to_create[district.pk] = SolarYearData(
+                        district=district,
+                        year_label=upload.year_label,
+                        **{metric: item[metric] for metric in METRIC_FIELDS},
+                    )
+                elif any(getattr(row, metric) != item[metric] for metric in METRIC_FIELDS):
+                    for metric in METRIC_FIELDS:
+                        setattr(row, metric, item[metric])
+                    row.updated_at = timezone.now()
+                    to_update[district.pk] = row
+
+            SolarYearData.objects.bulk_create(to_create.values(), batch_size=batch_size)
+            SolarYearData.objects.bulk_update(to_update.values(), [*METRIC_FIELDS, "updated_at"], batch_size=batch_size)
+            # A district repeated in a later chunk updates the row created here
+            existing.update(to_create)
+            created_ids.update(to_create)
+            updated_ids.update(to_update)
+
+            row_count += len(chunk)
+            if progress is not None:
+                progress(row_count)
+
+        if not row_count:
+            raise ValidationError("No district rows found to import in this file.")
+
+        deleted_ids = set(existing) - seen
+        if deleted_ids:
+            year_rows.filter(district_id__in=deleted_ids).delete()
+
+        updated_ids -= created_ids
+        changed_ids = created_ids | updated_ids | deleted_ids
+        if changed_ids:
+            refresh_solar_summaries([upload.year_label], changed_ids)
+        if changed_ids or renamed_ids:
+            SolarDataGeneration.bump()
+            schedule_forecast_refresh()
+
+    return {
+        "rows": row_count,
+        "created": len(created_ids),
+        "updated": len(updated_ids),
+        "deleted": len(deleted_ids),
+        "unchanged": len(seen - changed_ids),
+    }
 
 
 def delete_year_data(year_label):
-    deleted_count, _ = SolarYearData.objects.filter(year_label=year_label).delete()
+    with transaction.atomic():
+        year_rows = SolarYearData.objects.filter(year_label=year_label)
+        district_ids = set(year_rows.values_list("district_id", flat=True))
+        deleted_count, _ = year_rows.delete()
+        if deleted_count:
+            refresh_solar_summaries([year_label], district_ids)
+            SolarDataGeneration.bump()
+            schedule_forecast_refresh()
+
     return deleted_count
+
+
+def refresh_solar_summaries(year_labels, district_ids):
+    """Recompute the summary rows for the given years and districts only.
+
+    Callers run this inside the transaction that changed ``SolarYearData`` so
+    the summaries never disagree with the raw rows they were built from.
+    """
+    metric_sums = {metric: Sum(metric) for metric in METRIC_FIELDS}
+
+    for year_label in year_labels:
+        totals = SolarYearData.objects.filter(year_label=year_label).aggregate(
+            district_count=Count("id"), **metric_sums
+        )
+        if not totals["district_count"]:
+            SolarYearSummary.objects.filter(year_label=year_label).delete()
+            continue
+
+        SolarYearSummary.objects.update_or_create(
+            year_label=year_label,
+            defaults={key: value or 0 for key, value in totals.items()},
+        )
+
+    district_ids = set(district_ids)
+    if not district_ids:
+        return
+
+    district_rows = (
+        SolarYearData.objects.filter(district_id__in=district_ids)
+        .values("district_id")
+        .annotate(year_count=Count("id"), **metric_sums)
+        .order_by()
+    )
+    existing = SolarDistrictSummary.objects.in_bulk(district_ids, field_name="district_id")
+
+    to_create = []
+    to_update = []
+    for row in district_rows:
+        district_id = row.pop("district_id")
+        values = {key: value or 0 for key, value in row.items()}
+        summary = existing.pop(district_id, None)
+        if summary is None:
+            to_create.append(SolarDistrictSummary(district_id=district_id, **values))
+            continue
+        for key, value in values.items():
+            setattr(summary, key, value)
+        summary.updated_at = timezone.now()
+        to_update.append(summary)
+
+    SolarDistrictSummary.objects.bulk_create(to_create)
+    SolarDistrictSummary.objects.bulk_update(to_update, ["year_count", *METRIC_FIELDS, "updated_at"])
+    SolarDistrictSummary.objects.filter(district_id__in=list(existing)).delete()
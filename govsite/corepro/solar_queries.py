@@ -0,0 +1,59 @@
+from django.db.models import Count, Sum
+
+from .dataloader import METRIC_FIELDS
+from .models import SolarYearData, SolarYearSummary
+
+
+METRIC_SUMS = {metric: Sum(metric) for metric in METRIC_FIELDS}
+
+
+def solar_rows(years=None):
+    queryset = SolarYearData.objects.all()
+    if years is not None:
+        queryset = queryset.filter(year_label__in=list(years))
+    return queryset
+
+
+def _int_metrics(row):
+    return {metric: int(row.get(metric) or 0) for metric in METRIC_FIELDS}
+
+
+# GROUP BY queries over the raw rows, for year filters the summary tables
+# cannot answer; only the aggregated rows leave the database.
+
+def overall_totals(years=None):
+    return _int_metrics(solar_rows(years).aggregate(**METRIC_SUMS))
+
+
+def totals_by_district(years=None, order_by=("district__name", "district__code"), limit=None):
+    rows = (
+        solar_rows(years)
+        .values("district_id", "district__code", "district__name")
+        .annotate(row_count=Count("id"), **METRIC_SUMS)
+        .order_by(*order_by)
+    )
+    if limit is not None:
+        rows = rows[:limit]
+
+    return [
+        {
+            "district_id": row["district_id"],
+            "distcode": row["district__code"],
+            "district": row["district__name"],
+            "row_count": row["row_count"],
+            **_int_metrics(row),
+        }
+        for row in rows
+    ]
+
+
+# Reads from the summary tables maintained by refresh_solar_summaries; these
+# touch one row per year regardless of the raw data size.
+
+def summary_totals():
+    return _int_metrics(SolarYearSummary.objects.aggregate(**METRIC_SUMS))
+
+
+def summary_by_year():
+    rows = SolarYearSummary.objects.order_by("year_label").values("year_label", *METRIC_FIELDS)
+    return [{"year": row["year_label"], **_int_metrics(row)} for row in rows]
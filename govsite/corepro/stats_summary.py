@@ -0,0 +1,92 @@
+import numpy as np
+
+
+# Shown in place of a statistic that cannot be computed (too few values,
+# zero mean, ...), matching what the dashboards have always displayed.
+MISSING = "-"
+
+SUMMARY_STATS = ("mean", "median", "mode", "stdev", "cv", "skewness")
+
+
+def spread_statistics(n, mean, m2, m3):
+    """Sample stdev, CV (%) and skewness from central moments, element-wise.
+
+    ``m2`` and ``m3`` are the biased central moments (``mean((x - mean) ** k)``).
+    The skewness is the biased estimator used by ``scipy.stats.skew``. Entries
+    that cannot be computed are NaN: stdev and CV below two values (or a zero
+    mean for CV), skewness below three values or for constant data.
+    """
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stdev = np.sqrt(np.maximum(m2, 0) * n / (n - 1))
+        cv = stdev / mean * 100
+        skewness = m3 / m2 ** 1.5
+
+    stdev = np.where(n >= 2, stdev, np.nan)
+    cv = np.where((n >= 2) & (mean != 0), cv, np.nan)
+    constant = m2 <= (np.finfo(np.float64).eps * mean) ** 2
+    skewness = np.where((n >= 3) & ~constant, skewness, np.nan)
+    return stdev, cv, skewness
+
+
+def _column_modes(matrix):
+    """Most common value per column; ties go to the value seen first, like ``statistics.mode``."""
+    modes = []
+    for column in matrix.T:
+        values, first_index, counts = np.unique(column, return_index=True, return_counts=True)
+        candidates = np.flatnonzero(counts == counts.max())
+        modes.append(values[candidates[np.argmin(first_index[candidates])]])
+    return modes
+
+
+def _display(value, integer):
+    """Convert to a template value: ints stay ints, floats are rounded to 2 places."""
+    if integer and float(value).is_integer():
+        return int(value)
+    return round(float(value), 2)
+
+
+def summarize_columns(matrix):
+    """Mean, median, mode, sample stdev, CV and skewness of every column.
+
+    ``matrix`` is a districts x metrics array. Returns ``{stat: [value per
+    column]}`` for the names in ``SUMMARY_STATS``, with ``MISSING`` wherever a
+    statistic is undefined. Integer columns keep integer means, medians and
+    modes when the value is whole, as ``statistics`` did.
+    """
+    matrix = np.asarray(matrix)
+    n, num_columns = matrix.shape if matrix.ndim == 2 else (0, 0)
+    integer = np.issubdtype(matrix.dtype, np.integer)
+
+    if n == 0:
+        return {name: [MISSING] * num_columns for name in SUMMARY_STATS}
+
+    values = matrix.astype(np.float64)
+    mean = values.mean(axis=0)
+    centered = values - mean
+    m2 = (centered ** 2).mean(axis=0)
+    m3 = (centered ** 3).mean(axis=0)
+    stdev, cv, skewness = spread_statistics(n, mean, m2, m3)
+
+    ordered = np.sort(values, axis=0)
+    if n % 2:
+        median = ordered[n // 2]
+        median_integer = integer
+    else:
+        median = (ordered[n // 2 - 1] + ordered[n // 2]) / 2
+        median_integer = False
+
+    def optional(column_values):
+        return [MISSING if np.isnan(value) else round(float(value), 2) for value in column_values]
+
+    return {
+        "mean": [_display(value, integer) for value in mean],
+        "median": [_display(value, median_integer) for value in median],
+        "mode": [_display(value, integer) for value in _column_modes(matrix)],
+        "stdev": optional(stdev),
+        "cv": optional(cv),
+        "skewness": [
+            MISSING if n < 3 else round(float(value), 2)
+            for value in skewness
+        ],
+    }
@@ -1,3 +1,958 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import statistics
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import numpy as np
+from openpyxl import Workbook, load_workbook
+from scipy import stats
+
+from .aggregation import AGGREGATE_CACHE_SIZE, get_aggregate
+from .analytics import calculate_descriptive_metrics, correlation_matrix
+from .checks import check_import_progress_cache
+from .dataloader import SolarDataset, load_solar_excel
+from .forecast_runs import compute_forecast_run, get_district_forecasts, refresh_forecast_runs
+from .forecasting import (
+    DEFAULT_FORECAST_ENGINE,
+    FORECAST_ENGINES,
+    HOLT_ALPHA,
+    HOLT_BETA,
+    PREDICTION_INTERVAL_LEVEL,
+    RECENCY_DECAY,
+    calculate_district_forecast,
+    fit_holt,
+    fit_linear,
+    fit_weighted_recent,
+    get_forecast_engine,
+    pack_left,
+)
+from .import_jobs import (
+    STALE_JOB_ERROR,
+    enqueue_import,
+    enqueue_imports,
+    fail_stale_jobs,
+    run_import_batch,
+    run_import_job,
+)
+from .models import (
+    District,
+    DistrictForecast,
+    ForecastRun,
+    ImportJob,
+    SolarDataUpload,
+    SolarDistrictSummary,
+    SolarYearData,
+    SolarYearSummary,
+)
+from .partials import SolarPartials
+from .solar_data_service import (
+    delete_year_data,
+    import_solar_data_from_upload,
+    replace_year_data,
+    upsert_districts,
+)
+from .solar_queries import overall_totals, summary_by_year, totals_by_district
+from .stats_summary import MISSING, summarize_columns
+from .upload_preview import build_preview, load_preview, preview_paths
+from .xlsx_reader import FastSheet, OpenpyxlSheet
+
+
+HEADER = ["Distcode", "District", "Target", "Booking", "Installed", "Rejected"]
+
+
+def workbook_content(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def delimited_content(rows, delimiter=","):
+    lines = [HEADER] + [[str(value) for value in row] for row in rows]
+    return "\ufeff" + "\r\n".join(delimiter.join(line) for line in lines) + "\r\n"
+
+
+def district_rows(count, start=1):
+    return [
+        [code, f"District {code:03d}", 100, 80, 60, 5]
+        for code in range(start, start + count)
+    ]
+
+
+class SolarUploadTestCase(TestCase):
+    """Stores uploads under a throwaway MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        # The dataset cache is keyed by generation, which restarts with every
+        # test's transaction, so each test starts from an empty cache
+        patcher = mock.patch.dict("corepro.dataloader._dataset_cache", {"generation": None, "dataset": None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_upload(self, year_label, rows, extension="xlsx"):
+        filename = f"SolarPumpData_{year_label}.{extension}"
+        if extension == "xlsx":
+            content = workbook_content(rows)
+        else:
+            content = delimited_content(rows, "\t" if extension == "tsv" else ",").encode("utf-8")
+        upload = SolarDataUpload(
+            file=ContentFile(content, name=filename),
+            original_filename=filename,
+            year_label=year_label,
+        )
+        upload.save()
+        return upload
+
+
+class ImportSolarDataTests(SolarUploadTestCase):
+    def test_import_stores_rows_and_districts(self):
+        upload = self.create_upload("2023-24", district_rows(3) + [["", "Total", 300, 240, 180, 15]])
+
+        self.assertEqual(import_solar_data_from_upload(upload), 3)
+        self.assertEqual(SolarYearData.objects.filter(year_label="2023-24").count(), 3)
+        self.assertEqual(District.objects.count(), 3)
+
+    def test_delimited_uploads_import_like_xlsx(self):
+        rows = district_rows(3) + [["", "Total", 300, 240, 180, 15]]
+
+        self.assertEqual(import_solar_data_from_upload(self.create_upload("2022-23", rows, "csv")), 3)
+        self.assertEqual(import_solar_data_from_upload(self.create_upload("2023-24", rows, "tsv")), 3)
+        self.assertEqual(
+            list(SolarYearData.objects.filter(year_label="2022-23").values_list("district__code", "installed")),
+            list(SolarYearData.objects.filter(year_label="2023-24").values_list("district__code", "installed")),
+        )
+
+    def test_import_renames_existing_districts(self):
+        District.objects.create(code="1", name="Old Name")
+        upload = self.create_upload("2023-24", district_rows(2))
+
+        import_solar_data_from_upload(upload)
+
+        self.assertEqual(District.objects.get(code="1").name, "District 001")
+        self.assertEqual(District.objects.count(), 2)
+
+    def test_import_query_count_does_not_grow_with_rows(self):
+        # Both imports reuse, rename and create districts, so they take the
+        # same code paths and differ only in size.
+        import_solar_data_from_upload(self.create_upload("2022-23", district_rows(3) + district_rows(3, start=100)))
+
+        small_rows = district_rows(3) + district_rows(2, start=4)
+        small_rows[0][1] = "Renamed Small"
+        small = self.create_upload("2023-24", small_rows)
+        with CaptureQueriesContext(connection) as small_queries:
+            import_solar_data_from_upload(small)
+
+        # Small enough that no backend splits a bulk statement into batches
+        large_rows = district_rows(3, start=100) + district_rows(60, start=200)
+        large_rows[0][1] = "Renamed Large"
+        large = self.create_upload("2024-25", large_rows)
+        with self.assertNumQueries(len(small_queries)):
+            import_solar_data_from_upload(large)
+
+        self.assertEqual(SolarYearData.objects.filter(year_label="2024-25").count(), 63)
+        self.assertEqual(District.objects.get(code="100").name, "Renamed Large")
+
+    def test_each_chunk_costs_a_fixed_number_of_queries(self):
+        # The first import creates the generation counter; later ones only bump it
+        import_solar_data_from_upload(self.create_upload("2021-22", district_rows(1, start=100)))
+
+        # With two rows per chunk, four rows take two chunks and six take three
+        with CaptureQueriesContext(connection) as two_chunks:
+            import_solar_data_from_upload(self.create_upload("2022-23", district_rows(4)), batch_size=2)
+        with CaptureQueriesContext(connection) as three_chunks:
+            import_solar_data_from_upload(self.create_upload("2023-24", district_rows(6, start=10)), batch_size=2)
+
+        # District lookup, district upsert and row insert
+        self.assertEqual(len(three_chunks) - len(two_chunks), 3)
+        self.assertEqual(SolarYearData.objects.filter(year_label="2023-24").count(), 6)
+
+    def test_district_created_concurrently_is_renamed_not_duplicated(self):
+        District.objects.create(code="1", name="Added Elsewhere")
+        # Simulate another import committing the district after our lookup
+        with mock.patch.object(District.objects, "in_bulk", return_value={}):
+            districts = upsert_districts([{"district_code": "1", "district_name": "District 001"}])
+
+        self.assertEqual(District.objects.get(code="1").name, "District 001")
+        self.assertEqual(districts["1"].pk, District.objects.get(code="1").pk)
+
+    def test_replace_writes_only_changed_rows(self):
+        import_solar_data_from_upload(self.create_upload("2023-24", district_rows(4)))
+        untouched = SolarYearData.objects.get(district__code="1")
+
+        rows = district_rows(3) + district_rows(1, start=10)
+        rows[1][4] = 75
+        rows[2][1] = "Renamed"
+        diff = replace_year_data(self.create_upload("2023-24", rows))
+
+        self.assertEqual(diff, {"rows": 4, "created": 1, "updated": 1, "deleted": 1, "unchanged": 2})
+        self.assertEqual(
+            sorted(SolarYearData.objects.filter(year_label="2023-24").values_list("district__code", flat=True)),
+            ["1", "10", "2", "3"],
+        )
+        self.assertEqual(SolarYearData.objects.get(district__code="2").installed, 75)
+        self.assertEqual(SolarYearData.objects.get(district__code="1").updated_at, untouched.updated_at)
+        self.assertEqual(District.objects.get(code="3").name, "Renamed")
+
+
+class SolarDatasetCacheTests(SolarUploadTestCase):
+    def test_import_and_delete_invalidate_the_cached_dataset(self):
+        import_solar_data_from_upload(self.create_upload("2022-23", district_rows(3)))
+        dataset = load_solar_excel()
+        self.assertEqual(len(dataset), 3)
+
+        # Unchanged data costs only the generation lookup
+        with self.assertNumQueries(1):
+            self.assertIs(load_solar_excel(), dataset)
+
+        import_solar_data_from_upload(self.create_upload("2023-24", district_rows(2)))
+        reloaded = load_solar_excel()
+        self.assertGreater(reloaded.generation, dataset.generation)
+        self.assertEqual(reloaded.years, ["2022-23", "2023-24"])
+        self.assertEqual(len(reloaded), 5)
+
+        delete_year_data("2022-23")
+        self.assertEqual(load_solar_excel().years, ["2023-24"])
+        self.assertEqual(len(load_solar_excel()), 2)
+
+
+class SolarSummaryTests(SolarUploadTestCase):
+    def assertSummariesMatchRows(self):
+        """The summary tables hold exactly the GROUP BY totals of the raw rows."""
+        years = SolarYearData.objects.values_list("year_label", flat=True).distinct()
+        self.assertEqual(
+            {row["year"]: row for row in summary_by_year()},
+            {year: {"year": year, **overall_totals([year])} for year in years},
+        )
+        self.assertEqual(
+            {
+                summary.district.code: (summary.year_count, summary.target, summary.booking, summary.installed, summary.rejected)
+                for summary in SolarDistrictSummary.objects.select_related("district")
+            },
+            {
+                row["distcode"]: (row["row_count"], row["target"], row["booking"], row["installed"], row["rejected"])
+                for row in totals_by_district()
+            },
+        )
+
+    def test_summaries_follow_import_replace_and_delete(self):
+        import_solar_data_from_upload(self.create_upload("2022-23", district_rows(3)))
+        import_solar_data_from_upload(self.create_upload("2023-24", district_rows(2)))
+        self.assertSummariesMatchRows()
+        self.assertEqual(SolarDistrictSummary.objects.get(district__code="1").installed, 120)
+
+        rows = district_rows(1, start=2) + district_rows(1, start=10)
+        rows[0][4] = 75
+        replace_year_data(self.create_upload("2023-24", rows))
+        self.assertSummariesMatchRows()
+        self.assertEqual(SolarYearSummary.objects.get(year_label="2023-24").installed, 135)
+
+        delete_year_data("2022-23")
+        self.assertSummariesMatchRows()
+        self.assertEqual(list(SolarYearSummary.objects.values_list("year_label", flat=True)), ["2023-24"])
+        self.assertEqual(
+            sorted(SolarDistrictSummary.objects.values_list("district__code", flat=True)),
+            ["10", "2"],
+        )
+
+
+class ForecastRunTests(SolarUploadTestCase):
+    def setUp(self):
+        super().setUp()
+        # Forecasts need more than one year of history
+        import_solar_data_from_upload(self.create_upload("2022-23", district_rows(3)))
+        import_solar_data_from_upload(self.create_upload("2023-24", district_rows(2)))
+
+    def test_stored_run_is_reused_for_the_same_generation_and_engine(self):
+        dataset = load_solar_excel()
+        forecasts = get_district_forecasts(dataset, DEFAULT_FORECAST_ENGINE)
+        run = ForecastRun.objects.get()
+
+        # The run lookup and its forecast rows; nothing is fitted or written
+        with self.assertNumQueries(2):
+            self.assertEqual(get_district_forecasts(dataset, DEFAULT_FORECAST_ENGINE), forecasts)
+        self.assertEqual((run.generation, run.engine), (dataset.generation, DEFAULT_FORECAST_ENGINE))
+        self.assertEqual(DistrictForecast.objects.filter(run=run).count(), len(forecasts))
+
+    def test_refresh_replaces_runs_of_older_generations(self):
+        get_district_forecasts(load_solar_excel(), DEFAULT_FORECAST_ENGINE)
+        import_solar_data_from_upload(self.create_upload("2024-25", district_rows(2)))
+
+        refresh_forecast_runs()
+
+        generation = load_solar_excel().generation
+        self.assertEqual(
+            sorted(ForecastRun.objects.values_list("generation", "engine")),
+            sorted((generation, engine) for engine in FORECAST_ENGINES),
+        )
+
+    def test_run_stored_concurrently_is_returned_instead_of_duplicated(self):
+        dataset = load_solar_excel()
+        existing = compute_forecast_run(dataset, DEFAULT_FORECAST_ENGINE)
+        forecast_count = DistrictForecast.objects.count()
+
+        # Simulate another worker storing the run after our lookup missed it
+        missed = mock.Mock(**{"first.return_value": None})
+        with mock.patch.object(ForecastRun.objects, "filter", return_value=missed):
+            run = compute_forecast_run(dataset, DEFAULT_FORECAST_ENGINE)
+
+        self.assertEqual(run.pk, existing.pk)
+        self.assertEqual(ForecastRun.objects.count(), 1)
+        self.assertEqual(DistrictForecast.objects.count(), forecast_count)
+
+
+class UploadStorageTests(SolarUploadTestCase):
+    def test_identical_files_are_stored_once(self):
+        first = self.create_upload("2023-24", district_rows(3))
+        second = self.create_upload("2024-25", district_rows(3))
+
+        self.assertEqual(first.content_sha256, second.content_sha256)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertIn(first.content_sha256, first.file.name)
+
+        first.delete_file()
+        first.delete()
+        self.assertTrue(second.file.storage.exists(second.file.name))
+
+    @override_settings(SOLAR_IMPORT_EXECUTOR="command")
+    def test_upload_is_hashed_while_it_streams_in(self):
+        content = workbook_content(district_rows(3))
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+
+        # Small files stay in memory, larger ones spill to a temporary file
+        for year_label, max_memory_size in (("2023-24", 2_621_440), ("2024-25", 0)):
+            with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=max_memory_size), \
+                    mock.patch("corepro.models.file_sha256", side_effect=AssertionError("file read twice")):
+                self.client.post(reverse("dashboard"), {
+                    "confirm_upload": "yes",
+                    "solar_data_files": ContentFile(content, name=f"SolarPumpData_{year_label}.xlsx"),
+                })
+
+            upload = SolarDataUpload.objects.get(year_label=year_label)
+            self.assertEqual(upload.content_sha256, hashlib.sha256(content).hexdigest())
+
+    def test_download_answers_matching_etag_with_not_modified(self):
+        upload = self.create_upload("2023-24", district_rows(3))
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+        url = reverse("download_uploaded_file", args=[upload.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response["ETag"], f'"{upload.content_sha256}"')
+        response.close()
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_download_serves_byte_ranges(self):
+        upload = self.create_upload("2023-24", district_rows(3))
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+        url = reverse("download_uploaded_file", args=[upload.pk])
+        content = upload.file.read()
+        upload.file.close()
+
+        response = self.client.get(url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(content)}")
+        self.assertEqual(b"".join(response.streaming_content), content[10:20])
+
+        response = self.client.get(url, HTTP_RANGE=f"bytes={len(content)}-")
+        self.assertEqual(response.status_code, 416)
+
+    @override_settings(SOLAR_FILE_SERVING="x-accel-redirect")
+    def test_download_can_be_offloaded_to_nginx(self):
+        upload = self.create_upload("2023-24", district_rows(3))
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+
+        with override_settings(SOLAR_X_ACCEL_REDIRECT_LOCATIONS={self.media_root: "/protected/media/"}):
+            response = self.client.get(reverse("download_uploaded_file", args=[upload.pk]))
+
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/media/{upload.file.name}")
+        self.assertEqual(response.content, b"")
+        self.assertIn("SolarPumpData_2023-24.xlsx", response["Content-Disposition"])
+
+
+class UploadPreviewTests(SolarUploadTestCase):
+    def test_pages_follow_keyset_cursor_in_sorted_order(self):
+        rows = district_rows(5)
+        for row, installed in zip(rows, [30, 10, 50, 20, 40]):
+            row[4] = installed
+        file_path = self.create_upload("2023-24", rows).file.path
+        build_preview(file_path)
+        preview = load_preview(file_path)
+
+        first, cursor = preview.page(sort=4, descending=True, limit=2)
+        second, last_cursor = preview.page(sort=4, descending=True, after=cursor, limit=3)
+
+        self.assertEqual(preview.headers, HEADER)
+        self.assertEqual([cells[4] for _, cells in first + second], [50, 40, 30, 20, 10])
+        self.assertEqual(cursor, 4)
+        self.assertIsNone(last_cursor)
+        self.assertEqual(preview.page(after=2, limit=1)[0], [(3, rows[3])])
+
+    def test_concurrent_builds_leave_complete_artifacts_and_no_temporary_files(self):
+        file_path = self.create_upload("2023-24", district_rows(40)).file.path
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            counts = list(pool.map(build_preview, [file_path] * 4))
+
+        directory, name = os.path.split(file_path)
+        self.assertEqual(counts, [40] * 4)
+        self.assertEqual([entry for entry in os.listdir(directory) if entry.startswith(name) and entry.endswith(".tmp")], [])
+        self.assertEqual(load_preview(file_path).total, 40)
+
+    def test_mixed_columns_sort_numbers_then_text_then_blanks(self):
+        rows = district_rows(6)
+        for row, name in zip(rows, ["beta", 7, None, "Alpha", 2.5, "alpha"]):
+            row[1] = name
+        file_path = self.create_upload("2023-24", rows).file.path
+        build_preview(file_path)
+
+        page, _ = load_preview(file_path).page(sort=1)
+
+        self.assertEqual([cells[1] for _, cells in page], [2.5, 7, "Alpha", "alpha", "beta", None])
+
+    def test_preview_is_only_built_by_the_import(self):
+        upload = self.create_upload("2023-24", district_rows(3))
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+
+        response = self.client.get(reverse("upload_preview_rows", args=[upload.pk]))
+        self.assertEqual(response.status_code, 404)
+
+        # The page falls back to streaming the sheet instead of building the preview
+        response = self.client.get(reverse("view_uploaded_file_data", args=[upload.pk]))
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content).decode().count("<tr>"), 4)
+        self.assertFalse(os.path.exists(preview_paths(upload.file.path)[1]))
+
+    def test_full_mode_streams_every_row(self):
+        upload = self.create_upload("2023-24", district_rows(120) + [[999, "<b>Escaped</b>", 1, 1, 1, 1]])
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+
+        response = self.client.get(reverse("view_uploaded_file_data", args=[upload.pk]), {"mode": "full"})
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(content.count("<tr>"), 122)
+        self.assertIn("<td>District 120</td>", content)
+        self.assertIn("&lt;b&gt;Escaped&lt;/b&gt;", content)
+
+
+class DashboardExportTests(SolarUploadTestCase):
+    def setUp(self):
+        super().setUp()
+        import_solar_data_from_upload(self.create_upload("2022-23", district_rows(3)))
+        import_solar_data_from_upload(self.create_upload("2023-24", district_rows(2)))
+        self.client.force_login(get_user_model().objects.create_user("analyst"))
+
+    def test_descriptive_csv_honours_year_filter(self):
+        response = self.client.get(reverse("descriptive_export", args=["csv"]), {"year": "2023-24"})
+        lines = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+
+        self.assertEqual(lines[0].split(",")[:3], ["District", "Distcode", "Target"])
+        self.assertEqual(lines[1:], [
+            "District 001,1,100,80,60,5,60.0,80.0,75.0,6.25,20,-,-,-",
+            "District 002,2,100,80,60,5,60.0,80.0,75.0,6.25,20,-,-,-",
+        ])
+
+    def test_year_filtered_totals_are_grouped_in_the_database(self):
+        self.assertEqual(overall_totals(["2023-24"])["installed"], 120)
+        self.assertEqual(
+            [(row["distcode"], row["row_count"], row["installed"]) for row in totals_by_district(["2022-23", "2023-24"])],
+            [("1", 2, 120), ("2", 2, 120), ("3", 1, 60)],
+        )
+
+        response = self.client.get(reverse("descriptive_dashboard"), {"year": "2023-24"})
+        self.assertEqual(response.context["solar_total_installed"], "120")
+
+        # The correlations only need district totals, so the dataset is not loaded
+        with mock.patch("corepro.views.load_solar_excel", side_effect=AssertionError):
+            response = self.client.get(reverse("advanced_ana_dashboard"), {"year": "2023-24"})
+        self.assertEqual(response.context["district_count"], 2)
+        self.assertEqual(response.context["all_years"], ["2022-23", "2023-24"])
+
+    def test_predictive_xlsx_lists_selected_districts(self):
+        response = self.client.get(reverse("predictive_export", args=["xlsx"]), {"district": ["District 002"]})
+        workbook = load_workbook(BytesIO(b"".join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+
+        self.assertEqual(rows[0][:2], ("DC", "District"))
+        self.assertEqual([row[:2] for row in rows[1:]], [("2", "District 002")])
+        self.assertEqual(self.client.get(reverse("predictive_export", args=["pdf"])).status_code, 404)
+
+
+class DashboardApiTests(SolarUploadTestCase):
+    def setUp(self):
+        super().setUp()
+        import_solar_data_from_upload(self.create_upload("2022-23", district_rows(3)))
+        self.client.force_login(get_user_model().objects.create_user("analyst"))
+
+    def test_districts_payload_is_revalidated_by_generation(self):
+        url = reverse("api_solar_districts")
+        response = self.client.get(url, {"year": "2022-23"})
+        charts = response.json()["charts"]
+
+        self.assertEqual(charts["top_installed"]["labels"][0], "District 001")
+        self.assertEqual(charts["top_installed"]["mean"], 60)
+        self.assertIn("private", response["Cache-Control"])
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, {"year": "2022-23"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        import_solar_data_from_upload(self.create_upload("2023-24", district_rows(2)))
+        response = self.client.get(url, {"year": "2022-23"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_forecast_payload(self):
+        # Forecasts need more than one year of history
+        import_solar_data_from_upload(self.create_upload("2023-24", district_rows(2)))
+        forecast = self.client.get(reverse("api_solar_forecast"), {"district": ["District 002"]}).json()
+        self.assertEqual(forecast["columns"][:2], ["distcode", "district"])
+        self.assertEqual([row[1] for row in forecast["rows"]], ["District 002"])
+
+
+@override_settings(SOLAR_IMPORT_EXECUTOR="command")
+class ImportJobTests(SolarUploadTestCase):
+    def test_job_records_rows_processed(self):
+        job = enqueue_import(self.create_upload("2023-24", district_rows(4)))
+
+        job = run_import_job(job.pk)
+
+        self.assertEqual(job.status, ImportJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.rows_processed, 4)
+        self.assertIsNone(run_import_job(job.pk))
+
+    def test_failed_job_discards_upload(self):
+        upload = self.create_upload("2023-24", [])
+        job = run_import_job(enqueue_import(upload).pk)
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(job.error, "No district rows found to import in this file.")
+        self.assertFalse(SolarDataUpload.objects.filter(pk=upload.pk).exists())
+
+    def test_replace_job_supersedes_previous_upload(self):
+        previous = self.create_upload("2023-24", district_rows(3))
+        run_import_job(enqueue_import(previous).pk)
+
+        job = run_import_job(enqueue_import(self.create_upload("2023-24", district_rows(2)), replace=True).pk)
+
+        self.assertEqual(job.change_summary, "0 added, 0 changed, 1 removed")
+        self.assertEqual(list(SolarDataUpload.objects.values_list("pk", flat=True)), [job.upload_id])
+
+    def test_stale_running_job_is_failed_and_year_unblocked(self):
+        stale = enqueue_import(self.create_upload("2023-24", district_rows(3)))
+        fresh = enqueue_import(self.create_upload("2024-25", district_rows(2)))
+        ImportJob.objects.filter(pk=stale.pk).update(
+            status=ImportJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(hours=1),
+        )
+        ImportJob.objects.filter(pk=fresh.pk).update(status=ImportJob.STATUS_RUNNING, started_at=timezone.now())
+
+        self.assertEqual(fail_stale_jobs(), [stale.pk])
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(stale.error, STALE_JOB_ERROR)
+        self.assertFalse(SolarDataUpload.objects.filter(year_label="2023-24").exists())
+        self.assertEqual(ImportJob.objects.get(pk=fresh.pk).status, ImportJob.STATUS_RUNNING)
+
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+        self.client.post(reverse("dashboard"), {
+            "confirm_upload": "yes",
+            "solar_data_files": ContentFile(workbook_content(district_rows(4)), name="SolarPumpData_2023-24.xlsx"),
+        })
+        self.assertEqual(ImportJob.objects.filter(year_label="2023-24", status=ImportJob.STATUS_QUEUED).count(), 1)
+
+    def test_only_uploads_fail_stale_jobs(self):
+        stale = enqueue_import(self.create_upload("2023-24", district_rows(3)))
+        ImportJob.objects.filter(pk=stale.pk).update(
+            status=ImportJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(hours=1),
+        )
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+
+        self.client.get(reverse("dashboard"))
+        self.assertEqual(ImportJob.objects.get(pk=stale.pk).status, ImportJob.STATUS_RUNNING)
+
+        self.client.post(reverse("dashboard"), {
+            "confirm_upload": "yes",
+            "solar_data_files": ContentFile(workbook_content(district_rows(4)), name="SolarPumpData_2023-24.xlsx"),
+        })
+        self.assertEqual(ImportJob.objects.get(pk=stale.pk).status, ImportJob.STATUS_FAILED)
+        self.assertEqual(ImportJob.objects.filter(year_label="2023-24", status=ImportJob.STATUS_QUEUED).count(), 1)
+
+    def test_failed_upload_batch_leaves_no_stored_files(self):
+        content = workbook_content(district_rows(3))
+        sha = hashlib.sha256(content).hexdigest()
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+
+        with mock.patch("corepro.views.enqueue_imports", side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            self.client.post(reverse("dashboard"), {
+                "confirm_upload": "yes",
+                "solar_data_files": ContentFile(content, name="SolarPumpData_2023-24.xlsx"),
+            })
+
+        self.assertFalse(SolarDataUpload.objects.exists())
+        self.assertFalse(default_storage.exists(f"solar_uploads/{sha[:2]}/{sha}.xlsx"))
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_progress_needs_a_shared_cache(self):
+        self.assertEqual([warning.id for warning in check_import_progress_cache(None)], ["corepro.W001"])
+
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": self.media_root}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_import_progress_cache(None), [])
+
+    def test_batch_reports_each_file(self):
+        uploads = [
+            self.create_upload("2023-24", district_rows(3)),
+            self.create_upload("2024-25", district_rows(5)),
+            self.create_upload("2025-26", []),
+        ]
+        job_ids = [job.pk for job in enqueue_imports(uploads)]
+
+        run_import_batch(job_ids)
+
+        jobs = {job.year_label: job for job in ImportJob.objects.filter(pk__in=job_ids)}
+        self.assertEqual(jobs["2023-24"].rows_processed, 3)
+        self.assertEqual(jobs["2024-25"].rows_processed, 5)
+        self.assertEqual(jobs["2025-26"].status, ImportJob.STATUS_FAILED)
+        self.assertEqual(SolarYearData.objects.count(), 8)
+
+
+class XlsxReaderTests(TestCase):
+    def test_fast_reader_matches_openpyxl(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet["B3"] = "Header"
+        sheet["D3"] = 1.5
+        sheet["A5"] = 7
+        sheet["C5"] = datetime(2024, 1, 2)
+        sheet["E6"] = True
+        workbook.create_sheet("Other")["A1"] = "ignored"
+
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as handle:
+            workbook.save(handle.name)
+            with FastSheet(handle.name) as fast, OpenpyxlSheet(handle.name) as reference:
+                self.assertEqual(list(fast.rows()), list(reference.rows()))
+                self.assertEqual(
+                    list(fast.rows(columns=[2, 0], min_row=4)),
+                    list(reference.rows(columns=[2, 0], min_row=4)),
+                )
+
+    def patched_workbook(self, workbook, part_name, old, new):
+        """A temporary copy of ``workbook`` with ``old`` replaced by ``new`` in one zip part."""
+        source = BytesIO()
+        workbook.save(source)
+        handle = tempfile.NamedTemporaryFile(suffix=".xlsx")
+        self.addCleanup(handle.close)
+        with zipfile.ZipFile(source) as original, zipfile.ZipFile(handle, "w") as patched:
+            for item in original.infolist():
+                data = original.read(item)
+                if item.filename == part_name:
+                    data = data.replace(old, new)
+                patched.writestr(item, data)
+        handle.flush()
+        return handle.name
+
+    def test_fast_reader_opens_first_sheet_when_active_tab_is_out_of_range(self):
+        workbook = Workbook()
+        workbook.active["A1"] = "first"
+        workbook.create_sheet("Other")["A1"] = "second"
+        path = self.patched_workbook(workbook, "xl/workbook.xml", b'activeTab="0"', b'activeTab="5"')
+
+        with FastSheet(path) as fast:
+            self.assertEqual(list(fast.rows()), [("first",)])
+
+    def test_malformed_sheet_xml_is_a_validation_error(self):
+        workbook = Workbook()
+        for row in district_rows(3):
+            workbook.active.append(row)
+        path = self.patched_workbook(workbook, "xl/worksheets/sheet1.xml", b"</sheetData>", b"</sheetDat>")
+
+        with FastSheet(path) as fast, self.assertRaises(ValidationError):
+            list(fast.rows())
+
+
+def installed_dataset(series):
+    """A ``SolarDataset`` with one row per ``(district, year, installed)`` triple."""
+    return SolarDataset.from_rows(
+        (code, f"District {code}", year, 0, 0, installed, 0)
+        for code, year, installed in series
+    )
+
+
+class AggregateCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict("corepro.aggregation._aggregate_cache", {"dataset": None, "entries": {}})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dataset = installed_dataset(
+            (code, year, 10) for code in ("1", "2", "3") for year in ("2022-23", "2023-24")
+        )
+
+    def test_equivalent_filters_share_one_aggregate(self):
+        aggregate = get_aggregate(self.dataset, years=["2023-24", "2022-23", " 2022-23"], districts=["2", "1"])
+
+        self.assertIs(get_aggregate(self.dataset, years=["2022-23", "2023-24"], districts=["1", "2", "1"]), aggregate)
+        self.assertIsNot(get_aggregate(self.dataset, years=["2022-23"], districts=["1", "2"]), aggregate)
+
+    def test_least_recently_used_aggregate_is_evicted(self):
+        first = get_aggregate(self.dataset, years=["2022-23"])
+        recent = get_aggregate(self.dataset, years=["2023-24"])
+        for index in range(AGGREGATE_CACHE_SIZE - 2):
+            get_aggregate(self.dataset, districts=[str(index)])
+        # Using an entry makes it the most recent, so the next key evicts the other
+        self.assertIs(get_aggregate(self.dataset, years=["2023-24"]), recent)
+        get_aggregate(self.dataset, districts=["new"])
+
+        self.assertIs(get_aggregate(self.dataset, years=["2023-24"]), recent)
+        self.assertIsNot(get_aggregate(self.dataset, years=["2022-23"]), first)
+
+    def test_cache_is_dropped_when_the_dataset_changes(self):
+        aggregate = get_aggregate(self.dataset, years=["2022-23"])
+        reloaded = installed_dataset(
+            (code, year, 20) for code in ("1", "2", "3") for year in ("2022-23", "2023-24")
+        )
+
+        self.assertIsNot(get_aggregate(reloaded, years=["2022-23"]), aggregate)
+        self.assertIsNot(get_aggregate(self.dataset, years=["2022-23"]), aggregate)
+
+
+class MomentPartialsTests(SimpleTestCase):
+    YEARS = ("2021-22", "2022-23", "2023-24", "2024-25")
+    VALUES = {
+        "1": [10, 20, 40, 90],
+        # Large mean, tiny spread: raw power sums cancel catastrophically here
+        "2": [10 ** 9, 10 ** 9 + 1, 10 ** 9 + 5, 10 ** 9 + 2],
+        "3": [7, 7, 7, 7],
+    }
+
+    def setUp(self):
+        series = [
+            (code, year, value)
+            for code, values in self.VALUES.items()
+            for year, value in zip(self.YEARS, values)
+        ]
+        # A second row in one cell, so cells hold more than a single value
+        series.append(("1", "2022-23", 25))
+        self.partials = SolarPartials(installed_dataset(series))
+        self.values = {code: list(values) for code, values in self.VALUES.items()}
+        self.values["1"].insert(2, 25)
+
+    def test_merged_moments_match_scipy(self):
+        merged = self.partials.merge()
+        skewness = merged.skewness("installed")
+        cv = merged.coefficient_of_variation("installed")
+
+        for position, code in enumerate(merged.dataset.district_codes[:2]):
+            values = self.values[code]
+            self.assertAlmostEqual(skewness[position], stats.skew(values), places=9)
+            self.assertAlmostEqual(cv[position], stats.variation(values, ddof=1) * 100, places=9)
+        self.assertEqual(list(merged.totals("installed")), [sum(self.values[code]) for code in ("1", "2", "3")])
+
+    def test_year_subset_and_fallbacks(self):
+        merged = self.partials.merge(["2021-22", "2024-25"])
+
+        self.assertEqual(list(merged.counts), [2, 2, 2])
+        self.assertAlmostEqual(merged.sample_stdev("installed")[0], stats.tstd([10, 90]))
+        # Two values have no skewness, and constant values have none either
+        self.assertTrue(np.isnan(merged.skewness("installed")).all())
+        self.assertTrue(np.isnan(self.partials.merge().skewness("installed")[2]))
+
+
+class DescriptiveMetricsTests(SimpleTestCase):
+    def setUp(self):
+        self.dataset = SolarDataset.from_rows([
+            ("1", "Alpha", "2022-23", 100, 80, 60, 4),
+            # Zero booking and target count as zero rates, not as skipped rows
+            ("1", "Alpha", "2023-24", 0, 0, 0, 0),
+            ("2", "Beta", "2022-23", 50, 40, 40, 0),
+        ])
+
+    def test_matches_row_wise_averages(self):
+        self.assertEqual(calculate_descriptive_metrics(self.dataset), [
+            {"district": "Beta", "avg_efficiency": 1.0, "avg_target_rate": 0.8, "avg_rejection": 0.0,
+             "score": 0.92, "category": "High"},
+            {"district": "Alpha", "avg_efficiency": 0.375, "avg_target_rate": 0.3, "avg_rejection": 0.025,
+             "score": 0.465, "category": "Low"},
+        ])
+
+    def test_mask_limits_rows(self):
+        results = calculate_descriptive_metrics(self.dataset, self.dataset.year_mask(["2022-23"]))
+
+        self.assertEqual([(row["district"], row["score"], row["category"]) for row in results], [
+            ("Beta", 0.92, "High"),
+            ("Alpha", 0.73, "Moderate"),
+        ])
+
+
+class ForecastFitTests(SimpleTestCase):
+    # Rows of a districts x years matrix; zeros are years without a valid row
+    VALUES = np.array([
+        [0.0, 12.0, 0.0, 15.0, 21.0],
+        [30.0, 28.0, 25.0, 27.0, 20.0],
+        [0.0, 0.0, 0.0, 5.0, 0.0],
+    ])
+
+    def setUp(self):
+        self.values, self.valid = pack_left(self.VALUES, self.VALUES > 0)
+
+    def test_pack_left_keeps_year_order(self):
+        self.assertEqual(self.values[0].tolist(), [12.0, 15.0, 21.0, 0.0, 0.0])
+        self.assertEqual(self.valid.sum(axis=1).tolist(), [3, 5, 1])
+
+    def test_linear_fit_matches_polyfit(self):
+        slope, prediction, half_width = fit_linear(self.values, self.valid)
+
+        for row in range(2):
+            y = self.values[row][self.valid[row]]
+            x = np.arange(1, len(y) + 1)
+            coefficients = np.polyfit(x, y, 1)
+            self.assertAlmostEqual(slope[row], coefficients[0])
+            self.assertAlmostEqual(prediction[row], np.polyval(coefficients, len(y) + 1))
+        self.assertTrue(np.isnan(half_width[2]))
+
+    def test_district_forecast_skips_single_year_series(self):
+        rows = [
+            (str(code), f"District {code}", f"20{20 + year}-{21 + year}", 0, 0, int(value), 0)
+            for code, series in enumerate(self.VALUES, start=1)
+            for year, value in enumerate(series)
+            if value
+        ]
+        forecasts = {row["distcode"]: row for row in calculate_district_forecast(SolarDataset.from_rows(rows))}
+
+        self.assertEqual(sorted(forecasts), ["1", "2"])
+        expected = np.polyval(np.polyfit([1, 2, 3], [12, 15, 21], 1), 4)
+        self.assertEqual(forecasts["1"]["predicted_next_year_installed"], int(expected))
+        self.assertEqual(forecasts["1"]["growth_rate"], round(4.5 / 21 * 100, 2))
+
+    def test_linear_interval_matches_textbook_formula(self):
+        half_width = fit_linear(self.values, self.valid)[2]
+
+        y = self.values[1]
+        x = np.arange(1, 6)
+        residuals = y - np.polyval(np.polyfit(x, y, 1), x)
+        sigma = np.sqrt((residuals ** 2).sum() / 3)
+        quantile = stats.t.ppf(0.5 + PREDICTION_INTERVAL_LEVEL / 2, 3)
+        expected = quantile * sigma * np.sqrt(1 + 1 / 5 + (6 - x.mean()) ** 2 / ((x - x.mean()) ** 2).sum())
+        self.assertAlmostEqual(half_width[1], expected)
+
+    def test_weighted_fit_matches_weighted_polyfit(self):
+        slope, prediction, _ = fit_weighted_recent(self.values, self.valid)
+
+        for row in range(2):
+            y = self.values[row][self.valid[row]]
+            x = np.arange(1, len(y) + 1)
+            # polyfit weights the residuals, so it takes the square roots
+            coefficients = np.polyfit(x, y, 1, w=np.sqrt(RECENCY_DECAY ** (len(y) - x)))
+            self.assertAlmostEqual(slope[row], coefficients[0])
+            self.assertAlmostEqual(prediction[row], np.polyval(coefficients, len(y) + 1))
+
+    def test_holt_matches_step_by_step_smoothing(self):
+        slope, prediction, half_width = fit_holt(self.values, self.valid)
+
+        y = self.values[1]
+        level, trend, errors = y[0], y[1] - y[0], []
+        for step, value in enumerate(y[1:], start=1):
+            if step > 1:
+                errors.append(value - (level + trend))
+            new_level = HOLT_ALPHA * value + (1 - HOLT_ALPHA) * (level + trend)
+            trend = HOLT_BETA * (new_level - level) + (1 - HOLT_BETA) * trend
+            level = new_level
+
+        self.assertAlmostEqual(slope[1], trend)
+        self.assertAlmostEqual(prediction[1], level + trend)
+        self.assertAlmostEqual(half_width[1], stats.norm.ppf(0.975) * np.sqrt(np.mean(np.square(errors))))
+        # A single value has no one-step errors to size an interval from
+        self.assertTrue(np.isnan(half_width[2]))
+
+    def test_unknown_engine_falls_back_to_default(self):
+        self.assertEqual(get_forecast_engine("missing").name, DEFAULT_FORECAST_ENGINE)
+
+
+class CorrelationMatrixTests(SimpleTestCase):
+    def test_pairs_match_pearsonr_and_linregress(self):
+        matrix = np.array([[100, 80, 60], [120, 70, 65], [90, 95, 50], [130, 60, 80], [110, 85, 55]])
+        result = correlation_matrix(matrix)
+
+        for i in range(3):
+            for j in range(3):
+                if i == j:
+                    continue
+                fit = stats.linregress(matrix[:, i], matrix[:, j])
+                self.assertAlmostEqual(result["r"][i, j], stats.pearsonr(matrix[:, i], matrix[:, j])[0])
+                self.assertAlmostEqual(result["p"][i, j], fit.pvalue)
+                self.assertAlmostEqual(result["slope"][i, j], fit.slope)
+                self.assertAlmostEqual(result["intercept"][i, j], fit.intercept)
+
+    def test_constant_columns_and_short_samples_are_invalid(self):
+        result = correlation_matrix([[1, 5, 2], [2, 5, 4], [3, 5, 7]])
+        self.assertEqual(result["valid"].tolist(), [
+            [True, False, True],
+            [False, False, False],
+            [True, False, True],
+        ])
+        self.assertTrue(np.isnan(result["r"][0, 1]))
+
+        self.assertFalse(correlation_matrix([[1, 2], [2, 4]])["valid"].any())
+
+
+class SummarizeColumnsTests(SimpleTestCase):
+    def test_matches_statistics_module(self):
+        counts = [60, 75, 75, 90, 41, 300]
+        rates = [62.5, 71.25, 80.0, 12.5, 33.33, 80.0]
+        summary = summarize_columns(np.array([counts, [0] * 6]).T)
+        rate_summary = summarize_columns(np.array([rates]).T)
+
+        self.assertEqual(summary["mean"][0], round(statistics.mean(counts), 2))
+        self.assertEqual(summary["median"][0], statistics.median(counts))
+        self.assertEqual(summary["mode"][0], statistics.mode(counts))
+        self.assertEqual(summary["stdev"][0], round(statistics.stdev(counts), 2))
+        self.assertEqual(summary["cv"][0], round(statistics.stdev(counts) / statistics.mean(counts) * 100, 2))
+        self.assertEqual(summary["skewness"][0], round(stats.skew(counts), 2))
+        # A float64 reduction, so a mean on a rounding tie may land a cent
+        # away from the exact statistics.mean
+        self.assertAlmostEqual(rate_summary["mean"][0], statistics.mean(rates), delta=0.01)
+        self.assertEqual(rate_summary["median"], [round(statistics.median(rates), 2)])
+        self.assertEqual(rate_summary["mode"], [statistics.mode(rates)])
+        # A zero mean has no CV
+        self.assertEqual(summary["cv"][1], MISSING)
+
+    def test_short_columns_fall_back_to_missing(self):
+        single = summarize_columns(np.array([[5]]))
+        self.assertEqual((single["mean"], single["stdev"], single["cv"], single["skewness"]), ([5], [MISSING], [MISSING], [MISSING]))
+
+        pair = summarize_columns(np.array([[4], [6]]))
+        self.assertEqual((pair["median"], pair["stdev"], pair["skewness"]), ([5.0], [1.41], [MISSING]))
+
+        self.assertEqual(summarize_columns(np.empty((0, 2), dtype=np.int64))["mean"], [MISSING, MISSING])
@@ -0,0 +1,123 @@
+"""Readers for every upload format, behind the ``rows()`` interface of ``xlsx_reader``.
+
+Each reader yields the header as row 1 followed by the data rows, so the
+importer's header sniffing and row parsing work the same whatever the format.
+"""
+import csv
+from pathlib import Path
+from zipfile import BadZipFile
+
+from django.core.exceptions import ValidationError
+from openpyxl.utils.exceptions import InvalidFileException
+
+from .xlsx_reader import open_sheet
+
+
+CONTENT_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".csv": "text/csv",
+    ".tsv": "text/tab-separated-values",
+    ".parquet": "application/vnd.apache.parquet",
+}
+
+DELIMITERS = {".csv": ",", ".tsv": "\t"}
+
+PARQUET_BATCH_SIZE = 10_000
+
+
+def content_type_for(filename):
+    return CONTENT_TYPES.get(Path(filename).suffix.lower(), "application/octet-stream")
+
+
+class DelimitedSheet:
+    """CSV or TSV file streamed through the ``csv`` module."""
+
+    def __init__(self, file_path, delimiter):
+        self.file_path = file_path
+        self.delimiter = delimiter
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def rows(self, columns=None, min_row=1):
+        # utf-8-sig drops the byte order mark Excel writes at the start of CSV exports
+        try:
+            with open(self.file_path, newline="", encoding="utf-8-sig") as handle:
+                for row_number, row in enumerate(csv.reader(handle, delimiter=self.delimiter), start=1):
+                    if row_number < min_row:
+                        continue
+                    if columns is None:
+                        yield tuple(row)
+                    else:
+                        yield tuple(row[column] if column < len(row) else None for column in columns)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ValidationError("The file could not be read as UTF-8 delimited text.") from exc
+
+
+class ParquetSheet:
+    """Parquet file read in record batches with pyarrow, which is optional."""
+
+    def __init__(self, file_path):
+        try:
+            import pyarrow.parquet
+        except ImportError as exc:
+            raise ValidationError("Parquet uploads need the pyarrow package installed on the server.") from exc
+
+        try:
+            self.parquet_file = pyarrow.parquet.ParquetFile(file_path)
+        except (OSError, ValueError) as exc:
+            raise ValidationError("The file could not be read as a Parquet file.") from exc
+        self.names = self.parquet_file.schema_arrow.names
+
+    def close(self):
+        self.parquet_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def rows(self, columns=None, min_row=1):
+        positions = list(range(len(self.names))) if columns is None else list(columns)
+        present = [position for position in positions if position < len(self.names)]
+
+        if min_row <= 1:
+            yield tuple(self.names[position] if position in present else None for position in positions)
+
+        batches = self.parquet_file.iter_batches(
+            batch_size=PARQUET_BATCH_SIZE,
+            columns=[self.names[position] for position in sorted(set(present))],
+        )
+        row_number = 1
+        for batch in batches:
+            values = {name: batch.column(name).to_pylist() for name in batch.schema.names}
+            for index in range(batch.num_rows):
+                row_number += 1
+                if row_number < min_row:
+                    continue
+                yield tuple(
+                    values[self.names[position]][index] if position in present else None
+                    for position in positions
+                )
+
+
+def open_upload(file_path):
+    """Open an upload for reading by its extension; unreadable files raise ``ValidationError``."""
+    suffix = Path(file_path).suffix.lower()
+
+    if suffix in DELIMITERS:
+        return DelimitedSheet(file_path, DELIMITERS[suffix])
+    if suffix == ".parquet":
+        return ParquetSheet(file_path)
+
+    try:
+        return open_sheet(file_path)
+    except (BadZipFile, InvalidFileException) as exc:
+        raise ValidationError("The file could not be read as an Excel workbook.") from exc
@@ -0,0 +1,42 @@
+"""Upload handlers that hash files while Django receives them.
+
+The SHA-256 is updated chunk by chunk as each upload is written to memory or
+to its temporary file, and is attached to the resulting ``UploadedFile`` as
+``content_sha256``, so deduplication never reads the upload a second time.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class Sha256UploadMixin:
+    def new_file(self, *args, **kwargs):
+        # Set first: the memory handler ends new_file with StopFutureHandlers
+        self.digest = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        if remaining is None:
+            # This handler kept the chunk; anything returned goes to the next one
+            self.digest.update(raw_data)
+        return remaining
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.content_sha256 = self.digest.hexdigest()
+        return uploaded_file
+
+
+class Sha256MemoryFileUploadHandler(Sha256UploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class Sha256TemporaryFileUploadHandler(Sha256UploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def sha256_upload_handlers(request):
+    """Django's default memory-then-disk handlers, hashing as they write."""
+    return [Sha256MemoryFileUploadHandler(request), Sha256TemporaryFileUploadHandler(request)]
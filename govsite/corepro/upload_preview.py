@@ -0,0 +1,257 @@
+"""Cached preview artifacts for uploaded sheets.
+
+Each stored upload gets two files next to it the first time it is imported:
+
+* ``<file>.preview.jsonl``: the header row, then one JSON array per sheet row.
+* ``<file>.preview.npz``: the byte offset of every row line, plus one
+  ascending sort order per column.
+
+A page of the preview is then a handful of seeks into the JSONL file, in file
+order or sorted by any column, without opening the workbook again. Pages are
+addressed by keyset: the cursor is the id (sheet position) of the last row
+shown, which stays valid however many rows come before it.
+"""
+import json
+import os
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, time
+
+import numpy as np
+
+from .upload_formats import open_upload
+
+
+PREVIEW_PAGE_SIZE = 50
+PREVIEW_MAX_PAGE_SIZE = 500
+PREVIEW_CACHE_SIZE = 8
+# Rows rendered per chunk when the full table is streamed
+PREVIEW_STREAM_CHUNK_ROWS = 500
+
+
+def preview_paths(file_path):
+    file_path = os.fspath(file_path)
+    return f"{file_path}.preview.jsonl", f"{file_path}.preview.npz"
+
+
+def _json_cell(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+class _SortKeys:
+    """Sort keys of one column as typed arrays, so no row has to be kept.
+
+    Numbers sort before text and blanks last, so mixed columns still sort
+    sensibly; text compares case-insensitively.
+    """
+
+    NUMBER, TEXT, BLANK = 0, 1, 2
+
+    def __init__(self):
+        self.groups = array("b")
+        self.numbers = array("d")
+        self.texts = []
+
+    def pad(self, length):
+        """Add blanks up to ``length`` rows, for rows too short to reach this column."""
+        missing = length - len(self.groups)
+        if missing > 0:
+            self.groups.extend([self.BLANK] * missing)
+            self.numbers.extend([0.0] * missing)
+            self.texts.extend([""] * missing)
+
+    def append(self, value):
+        if value is None or value == "":
+            group, number, text = self.BLANK, 0.0, ""
+        elif isinstance(value, (int, float)):
+            group, number, text = self.NUMBER, float(value), ""
+        else:
+            group, number, text = self.TEXT, 0.0, str(value).lower()
+        self.groups.append(group)
+        self.numbers.append(number)
+        self.texts.append(text)
+
+    def order(self, length):
+        """Ascending row order; lexsort is stable, so ties keep sheet order."""
+        self.pad(length)
+        return np.lexsort((
+            np.array(self.texts, dtype=str),
+            np.frombuffer(self.numbers, dtype=np.float64),
+            np.frombuffer(self.groups, dtype=np.int8),
+        ))
+
+
+def _temporary_file(path, **kwargs):
+    # A unique name per writer, so concurrent builds never share a half-written file
+    directory, name = os.path.split(path)
+    return tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix=".tmp", delete=False, **kwargs)
+
+
+def build_preview(file_path):
+    """Write the preview artifacts for ``file_path`` and return the row count."""
+    rows_path, index_path = preview_paths(file_path)
+    offsets = []
+    columns = []
+    temporary_paths = []
+
+    try:
+        with open_upload(file_path) as sheet, _temporary_file(rows_path, mode="w", encoding="utf-8") as handle:
+            temporary_paths.append(handle.name)
+            rows = sheet.rows()
+            header = next(rows, ())
+            handle.write(json.dumps(["" if value is None else str(value) for value in header]) + "\n")
+            position = handle.tell()
+            for row in rows:
+                line = json.dumps([_json_cell(value) for value in row], default=str) + "\n"
+                for column, value in enumerate(row):
+                    if column == len(columns):
+                        columns.append(_SortKeys())
+                    columns[column].pad(len(offsets))
+                    columns[column].append(value)
+                offsets.append(position)
+                position += len(line.encode("utf-8"))
+                handle.write(line)
+
+        row_count = len(offsets)
+        width = max(len(header), len(columns))
+        orders = np.empty((width, row_count), dtype=np.int32)
+        for column in range(width):
+            orders[column] = columns[column].order(row_count) if column < len(columns) else np.arange(row_count)
+
+        # Saving to an open file stops np.savez from appending ".npz" to the name
+        with _temporary_file(index_path) as handle:
+            temporary_paths.append(handle.name)
+            np.savez(handle, offsets=np.array(offsets, dtype=np.int64), orders=orders)
+
+        # The index goes last: load_preview takes its presence to mean both are complete
+        os.replace(temporary_paths[0], rows_path)
+        os.replace(temporary_paths[1], index_path)
+    except BaseException:
+        for path in temporary_paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        raise
+    return row_count
+
+
+def iter_preview_rows(file_path):
+    """Yield the header and then every row of an upload, in sheet order.
+
+    Reads the preview JSONL when it has been built and the sheet itself
+    otherwise; either way only one row is held at a time.
+    """
+    rows_path = preview_paths(file_path)[0]
+    if not os.path.exists(rows_path):
+        with open_upload(file_path) as sheet:
+            yield from sheet.rows()
+        return
+
+    with open(rows_path, encoding="utf-8") as handle:
+        for line in handle:
+            yield json.loads(line)
+
+
+def delete_preview(file_path):
+    for path in preview_paths(file_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class UploadPreview:
+    """Read side of the preview artifacts for one stored upload."""
+
+    def __init__(self, file_path):
+        self.rows_path, index_path = preview_paths(file_path)
+        with np.load(index_path) as index:
+            self.offsets = index["offsets"]
+            self.orders = index["orders"]
+        with open(self.rows_path, encoding="utf-8") as handle:
+            self.headers = json.loads(handle.readline())
+        self._ranks = {}
+
+    @property
+    def total(self):
+        return len(self.offsets)
+
+    def _position(self, row_id, sort):
+        if sort is None:
+            return row_id
+        rank = self._ranks.get(sort)
+        if rank is None:
+            rank = np.empty(self.total, dtype=np.int32)
+            rank[self.orders[sort]] = np.arange(self.total, dtype=np.int32)
+            self._ranks[sort] = rank
+        return int(rank[row_id])
+
+    def page(self, sort=None, descending=False, after=None, limit=PREVIEW_PAGE_SIZE):
+        """Return ``(rows, next_cursor)`` where rows are ``(row_id, cells)`` pairs.
+
+        ``sort`` is a column index or None for sheet order. ``after`` is the
+        id of the last row of the previous page. Raises ``ValueError`` for a
+        column or cursor outside the sheet.
+        """
+        if sort is not None and not 0 <= sort < len(self.orders):
+            raise ValueError("Unknown sort column.")
+        if after is not None and not 0 <= after < self.total:
+            raise ValueError("Unknown row cursor.")
+        limit = max(1, min(limit, PREVIEW_MAX_PAGE_SIZE))
+
+        start = 0
+        if after is not None:
+            position = self._position(after, sort)
+            start = (self.total - 1 - position if descending else position) + 1
+
+        stop = min(start + limit, self.total)
+        if descending:
+            positions = range(self.total - 1 - start, self.total - 1 - stop, -1)
+        else:
+            positions = range(start, stop)
+        row_ids = [int(self.orders[sort][position]) if sort is not None else position for position in positions]
+
+        rows = []
+        with open(self.rows_path, "rb") as handle:
+            for row_id in row_ids:
+                handle.seek(self.offsets[row_id])
+                rows.append((row_id, json.loads(handle.readline())))
+
+        next_cursor = row_ids[-1] if row_ids and stop < self.total else None
+        return rows, next_cursor
+
+
+_preview_cache = OrderedDict()
+_preview_cache_lock = threading.Lock()
+
+
+def load_preview(file_path):
+    """Return the ``UploadPreview`` for ``file_path``.
+
+    The artifacts are built by the import job, never by a request; until
+    they exist this raises ``FileNotFoundError``. Loaded previews are kept
+    in a small LRU keyed by path and index mtime, so a rebuilt artifact is
+    picked up on the next request.
+    """
+    index_path = preview_paths(file_path)[1]
+    key = (index_path, os.stat(index_path).st_mtime_ns)
+
+    with _preview_cache_lock:
+        if key in _preview_cache:
+            _preview_cache.move_to_end(key)
+            return _preview_cache[key]
+
+    preview = UploadPreview(file_path)
+
+    with _preview_cache_lock:
+        _preview_cache[key] = preview
+        _preview_cache.move_to_end(key)
+        while len(_preview_cache) > PREVIEW_CACHE_SIZE:
+            _preview_cache.popitem(last=False)
+
+    return preview
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import index, inner, sitemap, contactus, dashboard, buttons, cards, table, typography, icons, forms, areachart, barchart, scatterchart, polarareachart, linechart, doughnut_piechart, predictive_dashboard, descriptive_dashboard, anamap_dashboard, advanced_ana_dashboard, download_solar_pump_data, view_uploaded_file_data, download_uploaded_file, delete_uploaded_file
+from .views import index, inner, sitemap, contactus, dashboard, buttons, cards, table, typography, icons, forms, areachart, barchart, scatterchart, polarareachart, linechart, doughnut_piechart, predictive_dashboard, predictive_export, descriptive_dashboard, descriptive_export, anamap_dashboard, advanced_ana_dashboard, download_solar_pump_data, view_uploaded_file_data, upload_preview_rows, download_uploaded_file, delete_uploaded_file, import_job_status, api_solar_districts, api_solar_forecast
 
 urlpatterns = [
     path('', index, name='index'),
@@ -9,8 +9,10 @@ urlpatterns = [
     path('dashboard/', dashboard, name='dashboard'),
     path('dashboard/download-solar-pump-data/', download_solar_pump_data, name='download_solar_pump_data'),
     path('dashboard/uploads/<int:upload_id>/view/', view_uploaded_file_data, name='view_uploaded_file_data'),
+    path('dashboard/uploads/<int:upload_id>/rows/', upload_preview_rows, name='upload_preview_rows'),
     path('dashboard/uploads/<int:upload_id>/download/', download_uploaded_file, name='download_uploaded_file'),
     path('dashboard/uploads/<int:upload_id>/delete/', delete_uploaded_file, name='delete_uploaded_file'),
+    path('dashboard/imports/<int:job_id>/status/', import_job_status, name='import_job_status'),
     path('dashboard/buttons/', buttons, name='buttons'),
     path('dashboard/cards/', cards, name='cards'),
     path('dashboard/table/', table, name='table'),
@@ -24,8 +26,12 @@ urlpatterns = [
     path('dashboard/charts/linechart/', linechart, name='linechart'),
     path('dashboard/charts/doughnut_piechart/', doughnut_piechart, name='doughnut_piechart'),
     path('dashboard/predictive/', predictive_dashboard, name='predictive_dashboard'),
+    path('dashboard/predictive/export/<str:file_format>/', predictive_export, name='predictive_export'),
     path('dashboard/descriptive/', descriptive_dashboard, name='descriptive_dashboard'),
+    path('dashboard/descriptive/export/<str:file_format>/', descriptive_export, name='descriptive_export'),
     path('dashboard/anamap/', anamap_dashboard, name='anamap_dashboard'),
     path('dashboard/advanced-ana/', advanced_ana_dashboard, name='advanced_ana_dashboard'),
+    path('api/solar/v1/districts/', api_solar_districts, name='api_solar_districts'),
+    path('api/solar/v1/forecast/', api_solar_forecast, name='api_solar_forecast'),
 
 ]
@@ -1,23 +1,36 @@
 import json
-from collections import defaultdict
 from pathlib import Path
-from statistics import StatisticsError
 from math import sqrt
-from scipy import stats
+import numpy as np
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
-from django.http import FileResponse, Http404
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
 from django.core.exceptions import ValidationError
-from django.views.decorators.http import require_POST
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.db import transaction
 from accounts.forms import LoginCaptchaForm
-from openpyxl import load_workbook
-from .dataloader import load_solar_excel
-from .analytics import calculate_descriptive_metrics
-from .forecasting import calculate_district_forecast
-from .models import SolarDataUpload
-from .solar_data_service import import_solar_data_from_upload, delete_year_data
+from .dataloader import METRIC_FIELDS, load_solar_excel
+from .analytics import correlation_matrix
+from .forecast_runs import get_district_forecasts
+from .forecasting import DEFAULT_FORECAST_ENGINE, FORECAST_ENGINES, get_forecast_engine
+from .import_jobs import enqueue_imports, fail_stale_jobs, job_progress
+from .models import ImportJob, SolarDataGeneration, SolarDataUpload
+from .solar_data_service import chunked, delete_year_data
+from .aggregation import get_aggregate
+from .stats_summary import MISSING, summarize_columns
+from .solar_queries import overall_totals, summary_by_year, summary_totals, totals_by_district
+from .exports import export_response
+from .file_serving import serve_file
+from .upload_formats import content_type_for
+from .upload_handlers import sha256_upload_handlers
+from .upload_preview import PREVIEW_PAGE_SIZE, PREVIEW_STREAM_CHUNK_ROWS, iter_preview_rows, load_preview
 
 # Create your views here.
 def index(request):
@@ -34,108 +47,124 @@ def sitemap(request):
 def contactus(request):
     return render(request, 'public/contactus.html')
 
+@csrf_exempt
 @login_required(login_url='login')
 def dashboard(request):
+    # Uploads are hashed while they stream in. The handlers must be in place
+    # before anything reads request.POST, so CSRF is checked after this.
+    request.upload_handlers = sha256_upload_handlers(request)
+    return _dashboard(request)
+
+
+@csrf_protect
+def _dashboard(request):
     if request.method == "POST":
         if request.POST.get("confirm_upload") != "yes":
             messages.error(request, "Upload cancelled. Please confirm before uploading.")
             return redirect("dashboard")
 
-        uploaded_file = request.FILES.get("solar_data_file")
-
-        if not uploaded_file:
-            messages.error(request, "Please choose a file to upload.")
-            return redirect("dashboard")
-
-        filename = Path(uploaded_file.name).name
+        # Jobs orphaned by a worker restart would otherwise block their years
+        # for good. run_import_jobs does this on every poll; the thread
+        # executor has no loop, so uploads check just before they need it.
+        fail_stale_jobs()
 
-        try:
-            SolarDataUpload.validate_filename(filename)
-        except ValidationError as exc:
-            messages.error(request, exc.message)
-            return redirect("dashboard")
+        # Several years can be uploaded at once; each file is checked and
+        # reported on its own, and the accepted ones are imported as one batch.
+        uploaded_files = request.FILES.getlist("solar_data_files") or request.FILES.getlist("solar_data_file")
 
-        year_label = SolarDataUpload.extract_year_label(filename)
-        if SolarDataUpload.objects.filter(year_label=year_label).exists():
-            messages.error(
-                request,
-                f"A file for {year_label} is already uploaded. Please delete it before uploading again.",
-            )
+        if not uploaded_files:
+            messages.error(request, "Please choose a file to upload.")
             return redirect("dashboard")
 
+        # Replace mode corrects years that are already uploaded by rewriting
+        # only the districts whose rows changed.
+        replace = request.POST.get("replace_existing") == "yes"
+
+        accepted = []
+        batch_years = set()
+        for uploaded_file in uploaded_files:
+            filename = Path(uploaded_file.name).name
+
+            try:
+                SolarDataUpload.validate_filename(filename)
+            except ValidationError as exc:
+                messages.error(request, f"{filename}: {exc.message}")
+                continue
+
+            year_label = SolarDataUpload.extract_year_label(filename)
+            content_sha256 = uploaded_file.content_sha256
+            if SolarDataUpload.objects.filter(year_label=year_label, content_sha256=content_sha256).exists():
+                messages.info(
+                    request,
+                    f"{filename} is identical to the file already uploaded for {year_label}. Nothing to import.",
+                )
+                continue
+            if year_label in batch_years:
+                messages.error(request, f"{filename}: another file for {year_label} is already in this upload.")
+                continue
+            if not replace and SolarDataUpload.objects.filter(year_label=year_label).exists():
+                messages.error(
+                    request,
+                    f"A file for {year_label} is already uploaded. Delete it first, "
+                    "or tick \"Replace existing years\" to apply only the changed rows.",
+                )
+                continue
+            if ImportJob.objects.filter(year_label=year_label, status__in=ImportJob.ACTIVE_STATUSES).exists():
+                messages.error(request, f"{filename}: an import for {year_label} is still running.")
+                continue
+
+            batch_years.add(year_label)
+            accepted.append((uploaded_file, filename, year_label, content_sha256))
+
+        uploads = []
         try:
-            upload = SolarDataUpload.objects.create(
-                file=uploaded_file,
-                original_filename=filename,
-                year_label=year_label,
-                uploaded_by=request.user,
-            )
-
-            imported_rows = import_solar_data_from_upload(upload)
+            with transaction.atomic():
+                for uploaded_file, filename, year_label, content_sha256 in accepted:
+                    try:
+                        with transaction.atomic():
+                            uploads.append(
+                                SolarDataUpload.objects.create(
+                                    file=uploaded_file,
+                                    original_filename=filename,
+                                    year_label=year_label,
+                                    content_sha256=content_sha256,
+                                    uploaded_by=request.user,
+                                )
+                            )
+                    except ValidationError as exc:
+                        messages.error(request, f"{filename}: {exc.message}")
+
+                if uploads:
+                    enqueue_imports(uploads, request.user, replace=replace)
+        except Exception:
+            # The rows are rolled back but the files already written to
+            # storage are not; delete_file keeps any still shared by a
+            # committed upload.
+            for upload in uploads:
+                upload.delete_file()
+            raise
+
+        for upload in uploads:
             messages.success(
                 request,
-                f"{filename} uploaded successfully and {imported_rows} district rows were stored.",
+                f"{upload.original_filename} uploaded successfully. Its district rows are being imported in the background.",
             )
-        except ValidationError as exc:
-            if "upload" in locals() and upload.pk:
-                if upload.file:
-                    upload.file.delete(save=False)
-                upload.delete()
-            messages.error(request, exc.message)
 
         return redirect("dashboard")
 
-    data = load_solar_excel()
-    descriptive_results = calculate_descriptive_metrics(data)
-
-    total_target = sum(row["target"] for row in data)
-    total_booking = sum(row["booking"] for row in data)
-    total_installed = sum(row["installed"] for row in data)
-    total_rejected = sum(row["rejected"] for row in data)
+    # The KPIs read the per-year summary rows, one row per year however
+    # many districts were imported
+    totals = summary_totals()
+    total_target = totals["target"]
+    total_booking = totals["booking"]
+    total_installed = totals["installed"]
+    total_rejected = totals["rejected"]
 
     install_rate = (total_installed / total_target * 100) if total_target else 0
     reject_rate = (total_rejected / total_booking * 100) if total_booking else 0
 
-    year_data = defaultdict(int)
-    for row in data:
-        year_data[row["year"]] += row["installed"]
-
-    year_labels = sorted(year_data.keys())
-    year_values = [year_data[year] for year in year_labels]
-
-    district_totals = defaultdict(int)
-    for row in data:
-        code = str(row["Distcode"])
-        district_totals[code] += row["installed"]
-
-    sorted_districts = sorted(
-        district_totals.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
-
-    top_10 = sorted_districts[:10]
-    top_labels = [d[0] for d in top_10]
-    top_installed = [d[1] for d in top_10]
-    top_installed_percentages = [
-        round((val / total_installed) * 100, 2) if total_installed else 0
-        for val in top_installed
-    ]
-
-    efficiency_sorted = sorted(
-        descriptive_results,
-        key=lambda x: x["avg_efficiency"],
-        reverse=True
-    )[:10]
-
-    eff_labels = [d["district"] for d in efficiency_sorted]
-    eff_values = [round(d["avg_efficiency"] * 100, 2) for d in efficiency_sorted]
-
-    bottom_10 = sorted(descriptive_results, key=lambda x: x["score"])[:10]
-    bottom_labels = [d["district"] for d in bottom_10]
-    bottom_scores = [d["score"] for d in bottom_10]
-
     uploaded_files = SolarDataUpload.objects.all()
+    import_jobs = ImportJob.objects.select_related("created_by")[:5]
 
     context = {
         "solar_total_target": f"{total_target:,}",
@@ -143,22 +172,19 @@ def dashboard(request):
         "solar_total_installed": f"{total_installed:,}",
         "solar_reject_rate": f"{reject_rate:.1f}%",
         "solar_install_rate": f"{install_rate:.1f}%",
-        "solar_year_labels": json.dumps(year_labels),
-        "solar_year_installed": json.dumps(year_values),
-        "solar_top_labels": json.dumps(top_labels),
-        "solar_top_installed_percentage": json.dumps(top_installed_percentages),
-        "solar_top_installed": json.dumps(top_installed),
-        "solar_eff_labels": json.dumps(eff_labels),
-        "solar_eff_values": json.dumps(eff_values),
-        "bottom_labels": json.dumps(bottom_labels),
-        "bottom_scores": json.dumps(bottom_scores),
-        "descriptive_results": descriptive_results,
         "uploaded_files": uploaded_files,
+        "import_jobs": import_jobs,
     }
 
     return render(request, 'dashboard/dashboard.html', context)
 
 
+@login_required(login_url='login')
+def import_job_status(request, job_id):
+    job = get_object_or_404(ImportJob, id=job_id)
+    return JsonResponse(job_progress(job))
+
+
 @login_required(login_url='login')
 def download_solar_pump_data(request):
     file_path = Path(__file__).resolve().parent / "data" / "SolarPumpData_2020-21.xlsx"
@@ -166,85 +192,94 @@ def download_solar_pump_data(request):
     if not file_path.exists():
         raise Http404("Requested file was not found.")
 
-    return FileResponse(
-        open(file_path, "rb"),
-        as_attachment=True,
-        filename=file_path.name,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-
+    return serve_file(request, file_path, file_path.name, content_type_for(file_path.name))
 
-@login_required(login_url='login')
-def predictive_dashboard(request):
-    from statistics import mean, median, mode, stdev, StatisticsError
 
-    data = load_solar_excel()
+def predictive_filters(request, data):
+    """The year, engine and districts chosen on the predictive dashboard."""
     selected_year = request.GET.get("year", "all")
+    selected_engine = get_forecast_engine(request.GET.get("engine", DEFAULT_FORECAST_ENGINE)).name
     raw_selected_districts = [str(d).strip() for d in request.GET.getlist("district") if str(d).strip()]
     explicit_none_selected = "__none__" in raw_selected_districts
     selected_districts = [district for district in raw_selected_districts if district != "__none__"]
 
-    all_years = sorted({str(row["year"]).strip() for row in data if str(row.get("year", "")).strip()})
-    all_districts = sorted({str(row["district"]).strip() for row in data if str(row.get("district", "")).strip()})
-
     if not selected_districts and not explicit_none_selected:
-        selected_districts = all_districts[:]
+        selected_districts = sorted({name for name in data.district_names if name})
 
-    selected_district_set = set(selected_districts)
+    return selected_year, selected_engine, selected_districts
 
-    districts_with_selected_year = {
-        row["district"]
-        for row in data
-        if selected_year == "all" or row["year"] == selected_year
-    }
 
-    scoped_data = [
-        row for row in data
-        if row["district"] in districts_with_selected_year
-        and row["district"] in selected_district_set
-    ]
+def forecast_table_rows(data, selected_year, selected_engine, selected_districts):
+    """Forecast rows for the selected districts, sorted by name, with loss rates added."""
+    year_scope = None if selected_year == "all" else [selected_year]
+    districts_with_selected_year = get_aggregate(data, years=year_scope).present
 
-    district_history_totals = defaultdict(lambda: {"booking": 0, "rejected": 0})
-    district_codes = {}
-    for row in scoped_data:
-        district = row.get("district")
-        district_history_totals[district]["booking"] += int(row.get("booking", 0) or 0)
-        district_history_totals[district]["rejected"] += int(row.get("rejected", 0) or 0)
-        if district not in district_codes:
-            district_codes[district] = str(row.get("Distcode", "") or "").strip()
+    # Loss rates use each selected district's full history, not just the chosen year
+    district_history = get_aggregate(data, districts=selected_districts)
+    district_history_booking = district_history.district_totals["booking"]
+    district_history_rejected = district_history.district_totals["rejected"]
+    district_positions = {
+        data.district_codes[idx]: idx
+        for idx in np.flatnonzero(district_history.present & districts_with_selected_year)
+    }
 
-    forecast_results = calculate_district_forecast(scoped_data)
+    forecast_results = [
+        row for row in get_district_forecasts(data, selected_engine)
+        if row["distcode"] in district_positions
+    ]
     forecast_results = sorted(forecast_results, key=lambda x: x["district"].lower())
 
     for row in forecast_results:
         growth_value = float(row.get("growth_rate", 0) or 0)
         row["growth_rate_abs"] = round(abs(growth_value), 2)
         row["is_negative_growth"] = growth_value < 0
-        row["distcode"] = district_codes.get(row["district"], "-") or "-"
+        position = district_positions[row["distcode"]]
+        row["distcode"] = row["distcode"] or "-"
 
-        history = district_history_totals.get(row["district"], {"booking": 0, "rejected": 0})
-        total_booking = history["booking"]
-        total_rejected = history["rejected"]
+        total_booking = int(district_history_booking[position])
+        total_rejected = int(district_history_rejected[position])
         row["loss_handling_scope_rate"] = round((total_rejected / total_booking) * 100, 2) if total_booking else 0
 
-    def safe_stat(data_points, func):
-        try:
-            if len(data_points) == 0:
-                return "-"
-            result = func(data_points)
-            return round(result, 2) if isinstance(result, float) else result
-        except (ValueError, StatisticsError):
-            return "-"
+    return forecast_results
+
+
+FORECAST_EXPORT_COLUMNS = [
+    ("DC", "distcode"),
+    ("District", "district"),
+    ("Growth Rate (%)", "growth_rate"),
+    ("Next Year Target", "predicted_next_year_installed"),
+    ("95% Range Lower", "prediction_lower"),
+    ("95% Range Upper", "prediction_upper"),
+    ("Loss Handling Scope (%)", "loss_handling_scope_rate"),
+    ("Risk Level", "risk_level"),
+]
+
+
+@login_required(login_url='login')
+def predictive_dashboard(request):
+    data = load_solar_excel()
+    selected_year, selected_engine, selected_districts = predictive_filters(request, data)
+
+    all_years = [year for year in data.years if year]
+    all_districts = sorted({name for name in data.district_names if name})
+
+    forecast_results = forecast_table_rows(data, selected_year, selected_engine, selected_districts)
 
     growth_rates = [float(row.get("growth_rate_abs", 0) or 0) for row in forecast_results]
     next_year_targets = [int(row.get("predicted_next_year_installed", 0) or 0) for row in forecast_results]
     loss_scope_rates = [float(row.get("loss_handling_scope_rate", 0) or 0) for row in forecast_results]
 
-    chart_labels = [row["district"] for row in forecast_results]
-    chart_values = [row["predicted_next_year_installed"] for row in forecast_results]
+    rate_summary = summarize_columns(
+        np.array([growth_rates, loss_scope_rates], dtype=np.float64).reshape(2, len(forecast_results)).T
+    )
+    target_summary = summarize_columns(
+        np.array(next_year_targets, dtype=np.int64).reshape(len(forecast_results), 1)
+    )
 
     context = {
         "selected_year": selected_year,
+        "selected_engine": selected_engine,
+        "forecast_engines": FORECAST_ENGINES.values(),
         "selected_districts": selected_districts,
         "all_years": all_years,
         "all_districts": all_districts,
@@ -252,67 +287,58 @@ def predictive_dashboard(request):
         "total_growth_rate": round(sum(growth_rates), 2),
         "total_next_year_target": sum(next_year_targets),
         "total_loss_scope_rate": round(sum(loss_scope_rates), 2),
-        "mean_growth_rate": safe_stat(growth_rates, mean),
-        "mean_next_year_target": safe_stat(next_year_targets, mean),
-        "mean_loss_scope_rate": safe_stat(loss_scope_rates, mean),
-        "median_growth_rate": safe_stat(growth_rates, median),
-        "median_next_year_target": safe_stat(next_year_targets, median),
-        "median_loss_scope_rate": safe_stat(loss_scope_rates, median),
-        "mode_growth_rate": safe_stat(growth_rates, mode),
-        "mode_next_year_target": safe_stat(next_year_targets, mode),
-        "mode_loss_scope_rate": safe_stat(loss_scope_rates, mode),
-        "std_dev_growth_rate": safe_stat(growth_rates, stdev),
-        "std_dev_next_year_target": safe_stat(next_year_targets, stdev),
-        "std_dev_loss_scope_rate": safe_stat(loss_scope_rates, stdev),
-        "chart_labels": json.dumps(chart_labels),
-        "chart_values": json.dumps(chart_values),
+        "mean_growth_rate": rate_summary["mean"][0],
+        "mean_next_year_target": target_summary["mean"][0],
+        "mean_loss_scope_rate": rate_summary["mean"][1],
+        "median_growth_rate": rate_summary["median"][0],
+        "median_next_year_target": target_summary["median"][0],
+        "median_loss_scope_rate": rate_summary["median"][1],
+        "mode_growth_rate": rate_summary["mode"][0],
+        "mode_next_year_target": target_summary["mode"][0],
+        "mode_loss_scope_rate": rate_summary["mode"][1],
+        "std_dev_growth_rate": rate_summary["stdev"][0],
+        "std_dev_next_year_target": target_summary["stdev"][0],
+        "std_dev_loss_scope_rate": rate_summary["stdev"][1],
     }
 
     return render(request, "dashboard/predictive.html", context)
 
 
 @login_required(login_url='login')
-def advanced_ana_dashboard(request):
+def predictive_export(request, file_format):
+    """The predictive dashboard's forecast table as CSV or XLSX, with the same filters."""
     data = load_solar_excel()
+    selected_year, selected_engine, selected_districts = predictive_filters(request, data)
+    rows = forecast_table_rows(data, selected_year, selected_engine, selected_districts)
+    return export_response(
+        file_format,
+        f"district_forecasts_{selected_engine}",
+        FORECAST_EXPORT_COLUMNS,
+        rows,
+        sheet_title="District Forecasts",
+    )
+
 
-    all_years = sorted({str(row.get("year", "")).strip() for row in data if str(row.get("year", "")).strip()})
+@login_required(login_url='login')
+def advanced_ana_dashboard(request):
+    # Only district totals are needed here, so the database groups the
+    # selected years itself and the dataset is never loaded
+    all_years = [row["year"] for row in summary_by_year()]
     selected_years = [str(year).strip() for year in request.GET.getlist("year") if str(year).strip()]
 
     if not selected_years:
         selected_years = all_years[:]
 
-    selected_year_set = set(selected_years)
-
-    filtered_data = [
-        row
-        for row in data
-        if str(row.get("year", "")).strip() in selected_year_set
-    ]
-
-    district_totals = defaultdict(lambda: {
-        "district": "",
-        "distcode": "",
-        "target": 0,
-        "booking": 0,
-        "installed": 0,
-        "rejected": 0,
-    })
-
-    for row in filtered_data:
-        district = str(row.get("district", "")).strip()
-        if not district:
-            continue
-        district_row = district_totals[district]
-        district_row["district"] = district
-        if not district_row["distcode"]:
-            district_row["distcode"] = str(row.get("Distcode", "") or "").strip()
-        district_row["target"] += int(row.get("target", 0) or 0)
-        district_row["booking"] += int(row.get("booking", 0) or 0)
-        district_row["installed"] += int(row.get("installed", 0) or 0)
-        district_row["rejected"] += int(row.get("rejected", 0) or 0)
-
     district_table_rows = sorted(
-        district_totals.values(),
+        (
+            {
+                "district": row["district"],
+                "distcode": row["distcode"],
+                **{metric: row[metric] for metric in METRIC_FIELDS},
+            }
+            for row in totals_by_district(selected_years)
+            if row["district"]
+        ),
         key=lambda x: x["district"].lower()
     )
 
@@ -328,28 +354,30 @@ def advanced_ana_dashboard(request):
             return "Weak"
         return "Very Weak"
 
+    metric_positions = {metric: pos for pos, metric in enumerate(METRIC_FIELDS)}
+    metric_matrix = np.array(
+        [[row[metric] for metric in METRIC_FIELDS] for row in district_table_rows],
+        dtype=np.float64,
+    ).reshape(len(district_table_rows), len(METRIC_FIELDS))
+    correlation = correlation_matrix(metric_matrix)
+
     def build_correlation(x_key, y_key, title, purpose):
-        points = []
-        x_values = []
-        y_values = []
-
-        for row in district_table_rows:
-            x_val = float(row.get(x_key, 0) or 0)
-            y_val = float(row.get(y_key, 0) or 0)
-            x_values.append(x_val)
-            y_values.append(y_val)
-            points.append({
+        x_pos = metric_positions[x_key]
+        y_pos = metric_positions[y_key]
+        x_values = metric_matrix[:, x_pos]
+        points = [
+            {
                 "district": row.get("district", "-"),
                 "distcode": row.get("distcode", "-"),
-                "x": x_val,
-                "y": y_val,
-            })
+                "x": float(row[x_key]),
+                "y": float(row[y_key]),
+            }
+            for row in district_table_rows
+        ]
 
         n = len(points)
-        x_unique = len(set(x_values))
-        y_unique = len(set(y_values))
 
-        if n < 3 or x_unique < 2 or y_unique < 2:
+        if not correlation["valid"][x_pos, y_pos]:
             return {
                 "title": title,
                 "purpose": purpose,
@@ -366,18 +394,16 @@ def advanced_ana_dashboard(request):
                 "regression_line": [],
             }
 
-        r_value, p_value = stats.pearsonr(x_values, y_values)
-        slope, intercept, _, _, _ = stats.linregress(x_values, y_values)
-        r_value = float(r_value)
-        p_value = float(p_value)
-        slope = float(slope)
-        intercept = float(intercept)
-        r_squared = r_value ** 2
-        min_x = min(x_values)
-        max_x = max(x_values)
+        r_value = float(correlation["r"][x_pos, y_pos])
+        p_value = float(correlation["p"][x_pos, y_pos])
+        slope = float(correlation["slope"][x_pos, y_pos])
+        intercept = float(correlation["intercept"][x_pos, y_pos])
+        r_squared = float(correlation["r_squared"][x_pos, y_pos])
+        min_x = float(x_values.min())
+        max_x = float(x_values.max())
         regression_line = [
-            {"x": float(min_x), "y": float(slope * min_x + intercept)},
-            {"x": float(max_x), "y": float(slope * max_x + intercept)},
+            {"x": min_x, "y": float(slope * min_x + intercept)},
+            {"x": max_x, "y": float(slope * max_x + intercept)},
         ]
 
         # Improvement 1: Use ±0.05 threshold for neutral case
@@ -401,11 +427,11 @@ def advanced_ana_dashboard(request):
             "x_key": x_key,
             "y_key": y_key,
             "sample_size": n,
-            "r": round(float(r_value), 4),
-            "p": round(float(p_value), 6),
+            "r": round(r_value, 4),
+            "p": round(p_value, 6),
             "p_display": p_display,
-            "r_squared": round(float(r_squared), 4),
-            "r_squared_percent": round(float(r_squared) * 100, 2),
+            "r_squared": round(r_squared, 4),
+            "r_squared_percent": round(r_squared * 100, 2),
             "is_significant": bool(p_value < 0.05),
             "strength": strength_label(r_value),
             "direction": direction,
@@ -435,73 +461,69 @@ def advanced_ana_dashboard(request):
         ),
     ]
 
+    # Any other metric pair can be requested as ?pair=x_metric:y_metric
+    default_pairs = {(row["x_key"], row["y_key"]) for row in correlation_results}
+    for raw_pair in request.GET.getlist("pair"):
+        x_key, _, y_key = str(raw_pair).strip().partition(":")
+        if x_key not in metric_positions or y_key not in metric_positions or x_key == y_key:
+            continue
+        if (x_key, y_key) in default_pairs:
+            continue
+        default_pairs.add((x_key, y_key))
+        correlation_results.append(
+            build_correlation(
+                x_key,
+                y_key,
+                f"{x_key.title()} ↔ {y_key.title()}",
+                "Additional pair requested for this view."
+            )
+        )
+
+    correlation_matrix_rows = [
+        {
+            "metric": metric,
+            "values": [
+                round(float(correlation["r"][row_pos, col_pos]), 4)
+                if correlation["valid"][row_pos, col_pos] else None
+                for col_pos in range(len(METRIC_FIELDS))
+            ],
+        }
+        for row_pos, metric in enumerate(METRIC_FIELDS)
+    ]
+
     context = {
         "all_years": all_years,
         "selected_years": selected_years,
         "district_count": len(district_table_rows),
         "correlation_results": correlation_results,
         "correlation_results_json": json.dumps(correlation_results),
+        "correlation_metrics": METRIC_FIELDS,
+        "correlation_matrix_rows": correlation_matrix_rows,
     }
 
     return render(request, "dashboard/advanced_ana.html", context)
 
 
-@login_required(login_url='login')
-def descriptive_dashboard(request):
-    from statistics import mean, median, mode, stdev
-    
-    data = load_solar_excel()
-
-    all_years = sorted({str(row["year"]).strip() for row in data if str(row.get("year", "")).strip()})
+def descriptive_selected_years(request, data):
     selected_years = [str(year).strip() for year in request.GET.getlist("year") if str(year).strip()]
+    return selected_years or [year for year in data.years if year]
 
-    if not selected_years:
-        selected_years = all_years[:]
-
-    selected_year_set = set(selected_years)
 
-    filtered_data = [
-        row
-        for row in data
-        if str(row.get("year", "")).strip() in selected_year_set
-    ]
+def descriptive_table_rows(data, aggregate):
+    """One row of totals and rates per district present in ``aggregate``, in dataset order."""
+    merged = aggregate.merged
+    district_sums = aggregate.district_totals
 
-    total_target = sum(row["target"] for row in filtered_data)
-    total_booking = sum(row["booking"] for row in filtered_data)
-    total_installed = sum(row["installed"] for row in filtered_data)
-    total_rejected = sum(row["rejected"] for row in filtered_data)
-
-    install_rate = (total_installed / total_target * 100) if total_target else 0
-    reject_rate = (total_rejected / total_booking * 100) if total_booking else 0
-
-    district_totals = defaultdict(lambda: {
-        "district": "",
-        "distcode": "",
-        "target": 0,
-        "booking": 0,
-        "installed": 0,
-        "rejected": 0,
-    })
-    district_installed_series = defaultdict(list)
-
-    for row in filtered_data:
-        district = row["district"]
-        district_row = district_totals[district]
-        district_row["district"] = district
-        if not district_row["distcode"]:
-            district_row["distcode"] = str(row.get("Distcode", "") or "").strip()
-        district_row["target"] += int(row.get("target", 0) or 0)
-        district_row["booking"] += int(row.get("booking", 0) or 0)
-        district_row["installed"] += int(row.get("installed", 0) or 0)
-        district_row["rejected"] += int(row.get("rejected", 0) or 0)
-        district_installed_series[district].append(int(row.get("installed", 0) or 0))
+    installed_counts = merged.counts
+    installed_cv = merged.coefficient_of_variation("installed")
+    installed_skew = merged.skewness("installed")
 
     district_table_rows = []
-    for district_row in district_totals.values():
-        target = district_row["target"]
-        booking = district_row["booking"]
-        installed = district_row["installed"]
-        rejected = district_row["rejected"]
+    for idx in np.flatnonzero(aggregate.present):
+        target = int(district_sums["target"][idx])
+        booking = int(district_sums["booking"][idx])
+        installed = int(district_sums["installed"][idx])
+        rejected = int(district_sums["rejected"][idx])
         booking_difference = booking - installed
         
         tar = round((installed / target) * 100, 2) if target else 0
@@ -510,8 +532,8 @@ def descriptive_dashboard(request):
         rr = round((rejected / booking) * 100, 2) if booking else 0
 
         district_table_rows.append({
-            "district": district_row["district"],
-            "distcode": district_row["distcode"],
+            "district": data.district_names[idx],
+            "distcode": data.district_codes[idx],
             "target": target,
             "booking": booking,
             "installed": installed,
@@ -521,69 +543,12 @@ def descriptive_dashboard(request):
             "installation_conversion_rate": icr,
             "rejection_rate": rr,
             "booking_difference": booking_difference,
+            "relative_variability": "-" if np.isnan(installed_cv[idx]) else round(float(installed_cv[idx]), 2),
+            "skewness": "-" if installed_counts[idx] < 3 else round(float(installed_skew[idx]), 2),
         })
 
-    top_installed_rows = sorted(district_table_rows, key=lambda x: x["installed"], reverse=True)[:10]
-    bottom_installed_rows = sorted(district_table_rows, key=lambda x: x["installed"])[:10]
-    top_rejected_rows = sorted(district_table_rows, key=lambda x: x["rejected"], reverse=True)[:10]
-    top_booking_diff_rows = sorted(district_table_rows, key=lambda x: x["booking_difference"], reverse=True)[:10]
-    top_icr_rows = sorted(district_table_rows, key=lambda x: x["installation_conversion_rate"], reverse=True)[:10]
-    district_table_rows = sorted(district_table_rows, key=lambda x: x["district"].lower())
-
-    # Calculate statistics
-    targets = [row["target"] for row in district_table_rows]
-    bookings = [row["booking"] for row in district_table_rows]
-    installeds = [row["installed"] for row in district_table_rows]
-    rejecteds = [row["rejected"] for row in district_table_rows]
-    tars = [row["target_achievement_rate"] for row in district_table_rows]
-    brrs = [row["booking_response_rate"] for row in district_table_rows]
-    icrs = [row["installation_conversion_rate"] for row in district_table_rows]
-    rrs = [row["rejection_rate"] for row in district_table_rows]
-    booking_diffs = [row["booking_difference"] for row in district_table_rows]
-
-    def safe_stat(data, func):
-        try:
-            if len(data) == 0:
-                return "-"
-            result = func(data)
-            return round(result, 2) if isinstance(result, float) else result
-        except (ValueError, StatisticsError):
-            return "-"
-
-    def safe_numeric_stat(data, func):
-        try:
-            if len(data) == 0:
-                return 0
-            return round(float(func(data)), 2)
-        except (ValueError, StatisticsError, TypeError):
-            return 0
-
-    def coefficient_of_variation(data):
-        """Calculate relative variability (CV = std dev / mean)"""
-        try:
-            if len(data) < 2:
-                return "-"
-            m = mean(data)
-            if m == 0:
-                return "-"
-            return round((stdev(data) / m) * 100, 2)
-        except (ValueError, StatisticsError):
-            return "-"
-
-    def calculate_skewness(data):
-        """Calculate skewness"""
-        try:
-            if len(data) < 3:
-                return "-"
-            return round(stats.skew(data), 2)
-        except:
-            return "-"
-
-    # Add relative variability and skewness to each district row
+    # Classify each district's installed distribution from its merged skewness
     for row in district_table_rows:
-        district_series = district_installed_series.get(row["district"], [])
-        row["relative_variability"] = coefficient_of_variation(district_series)
-        row["skewness"] = calculate_skewness(district_series)
         skewness_value = row["skewness"]
         if isinstance(skewness_value, (int, float)):
             row["distribution_type"] = (
@@ -594,6 +559,79 @@ def descriptive_dashboard(request):
         else:
             row["distribution_type"] = "-"
 
+    return district_table_rows
+
+
+DESCRIPTIVE_COUNT_KEYS = ("target", "booking", "installed", "rejected", "booking_difference")
+DESCRIPTIVE_RATE_KEYS = ("target_achievement_rate", "booking_response_rate", "installation_conversion_rate", "rejection_rate")
+
+
+def descriptive_statistics(rows):
+    """Summary statistics of the district rows, one column per metric, in a single pass.
+
+    Returns ``(count_stat, rate_stat)``, each called as ``stat(name, key)``.
+    """
+    count_summary = summarize_columns(
+        np.array([[row[key] for key in DESCRIPTIVE_COUNT_KEYS] for row in rows], dtype=np.int64)
+        .reshape(len(rows), len(DESCRIPTIVE_COUNT_KEYS))
+    )
+    rate_summary = summarize_columns(
+        np.array([[row[key] for key in DESCRIPTIVE_RATE_KEYS] for row in rows], dtype=np.float64)
+        .reshape(len(rows), len(DESCRIPTIVE_RATE_KEYS))
+    )
+
+    def count_stat(name, key):
+        return count_summary[name][DESCRIPTIVE_COUNT_KEYS.index(key)]
+
+    def rate_stat(name, key):
+        return rate_summary[name][DESCRIPTIVE_RATE_KEYS.index(key)]
+
+    return count_stat, rate_stat
+
+
+DESCRIPTIVE_EXPORT_COLUMNS = [
+    ("District", "district"),
+    ("Distcode", "distcode"),
+    ("Target", "target"),
+    ("Booking", "booking"),
+    ("Installed", "installed"),
+    ("Rejected", "rejected"),
+    ("TAR (%)", "target_achievement_rate"),
+    ("BRR (%)", "booking_response_rate"),
+    ("ICR (%)", "installation_conversion_rate"),
+    ("RR (%)", "rejection_rate"),
+    ("Booking Difference", "booking_difference"),
+    ("RV (%)", "relative_variability"),
+    ("Skewness", "skewness"),
+    ("Distribution", "distribution_type"),
+]
+
+
+@login_required(login_url='login')
+def descriptive_dashboard(request):
+    data = load_solar_excel()
+
+    all_years = [year for year in data.years if year]
+    selected_years = descriptive_selected_years(request, data)
+
+    aggregate = get_aggregate(data, years=selected_years)
+
+    # The KPI sums come straight from a filtered aggregate query
+    totals = overall_totals(selected_years)
+    total_target = totals["target"]
+    total_booking = totals["booking"]
+    total_installed = totals["installed"]
+    total_rejected = totals["rejected"]
+
+    install_rate = (total_installed / total_target * 100) if total_target else 0
+    reject_rate = (total_rejected / total_booking * 100) if total_booking else 0
+
+    district_table_rows = descriptive_table_rows(data, aggregate)
+
+    district_table_rows = sorted(district_table_rows, key=lambda x: x["district"].lower())
+
+    count_stat, rate_stat = descriptive_statistics(district_table_rows)
+
     context = {
         "selected_years": selected_years,
         "all_years": all_years,
@@ -609,105 +647,97 @@ def descriptive_dashboard(request):
         "total_booking": total_booking,
         "total_installed": total_installed,
         "total_rejected": total_rejected,
-        "mean_target": safe_stat(targets, mean),
-        "mean_booking": safe_stat(bookings, mean),
-        "mean_installed": safe_stat(installeds, mean),
-        "mean_rejected": safe_stat(rejecteds, mean),
-        "mean_tar": safe_stat(tars, mean),
-        "mean_brr": safe_stat(brrs, mean),
-        "mean_icr": safe_stat(icrs, mean),
-        "mean_rr": safe_stat(rrs, mean),
-        "median_target": safe_stat(targets, median),
-        "median_booking": safe_stat(bookings, median),
-        "median_installed": safe_stat(installeds, median),
-        "median_rejected": safe_stat(rejecteds, median),
-        "median_tar": safe_stat(tars, median),
-        "median_brr": safe_stat(brrs, median),
-        "median_icr": safe_stat(icrs, median),
-        "median_rr": safe_stat(rrs, median),
-        "mode_target": safe_stat(targets, mode),
-        "mode_booking": safe_stat(bookings, mode),
-        "mode_installed": safe_stat(installeds, mode),
-        "mode_rejected": safe_stat(rejecteds, mode),
-        "mode_tar": safe_stat(tars, mode),
-        "mode_brr": safe_stat(brrs, mode),
-        "mode_icr": safe_stat(icrs, mode),
-        "mode_rr": safe_stat(rrs, mode),
-        "std_dev_target": safe_stat(targets, stdev),
-        "std_dev_booking": safe_stat(bookings, stdev),
-        "std_dev_installed": safe_stat(installeds, stdev),
-        "std_dev_rejected": safe_stat(rejecteds, stdev),
-        "std_dev_tar": safe_stat(tars, stdev),
-        "std_dev_brr": safe_stat(brrs, stdev),
-        "std_dev_icr": safe_stat(icrs, stdev),
-        "std_dev_rr": safe_stat(rrs, stdev),
+        "mean_target": count_stat("mean", "target"),
+        "mean_booking": count_stat("mean", "booking"),
+        "mean_installed": count_stat("mean", "installed"),
+        "mean_rejected": count_stat("mean", "rejected"),
+        "mean_tar": rate_stat("mean", "target_achievement_rate"),
+        "mean_brr": rate_stat("mean", "booking_response_rate"),
+        "mean_icr": rate_stat("mean", "installation_conversion_rate"),
+        "mean_rr": rate_stat("mean", "rejection_rate"),
+        "median_target": count_stat("median", "target"),
+        "median_booking": count_stat("median", "booking"),
+        "median_installed": count_stat("median", "installed"),
+        "median_rejected": count_stat("median", "rejected"),
+        "median_tar": rate_stat("median", "target_achievement_rate"),
+        "median_brr": rate_stat("median", "booking_response_rate"),
+        "median_icr": rate_stat("median", "installation_conversion_rate"),
+        "median_rr": rate_stat("median", "rejection_rate"),
+        "mode_target": count_stat("mode", "target"),
+        "mode_booking": count_stat("mode", "booking"),
+        "mode_installed": count_stat("mode", "installed"),
+        "mode_rejected": count_stat("mode", "rejected"),
+        "mode_tar": rate_stat("mode", "target_achievement_rate"),
+        "mode_brr": rate_stat("mode", "booking_response_rate"),
+        "mode_icr": rate_stat("mode", "installation_conversion_rate"),
+        "mode_rr": rate_stat("mode", "rejection_rate"),
+        "std_dev_target": count_stat("stdev", "target"),
+        "std_dev_booking": count_stat("stdev", "booking"),
+        "std_dev_installed": count_stat("stdev", "installed"),
+        "std_dev_rejected": count_stat("stdev", "rejected"),
+        "std_dev_tar": rate_stat("stdev", "target_achievement_rate"),
+        "std_dev_brr": rate_stat("stdev", "booking_response_rate"),
+        "std_dev_icr": rate_stat("stdev", "installation_conversion_rate"),
+        "std_dev_rr": rate_stat("stdev", "rejection_rate"),
         # Relative variability (Coefficient of Variation)
-        "cv_installed": coefficient_of_variation(installeds),
-        "cv_icr": coefficient_of_variation(icrs),
+        "cv_installed": count_stat("cv", "installed"),
+        "cv_icr": rate_stat("cv", "installation_conversion_rate"),
         # Skewness
-        "skew_installed": calculate_skewness(installeds),
-        "skew_icr": calculate_skewness(icrs),
-        # Chart data
-        "solar_top_labels": json.dumps([row["district"] for row in top_installed_rows]),
-        "solar_top_installed": json.dumps([row["installed"] for row in top_installed_rows]),
-        "mean_installed_value": safe_numeric_stat(installeds, mean),
-        "bottom_labels": json.dumps([row["district"] for row in bottom_installed_rows]),
-        "bottom_installed": json.dumps([row["installed"] for row in bottom_installed_rows]),
-        "rejected_diff_labels": json.dumps([row["district"] for row in top_rejected_rows]),
-        "rejected_diff_values": json.dumps([row["rejected"] for row in top_rejected_rows]),
-        "booking_diff_labels": json.dumps([row["district"] for row in top_booking_diff_rows]),
-        "booking_diff_values": json.dumps([row["booking_difference"] for row in top_booking_diff_rows]),
-        "icr_labels": json.dumps([row["district"] for row in top_icr_rows]),
-        "icr_values": json.dumps([row["installation_conversion_rate"] for row in top_icr_rows]),
-        "mean_icr_value": safe_numeric_stat(icrs, mean),
-        "mean_rejected_value": safe_numeric_stat(rejecteds, mean),
-        "mean_booking_diff_value": safe_numeric_stat(booking_diffs, mean),
+        "skew_installed": count_stat("skewness", "installed"),
+        "skew_icr": rate_stat("skewness", "installation_conversion_rate"),
     }
 
     return render(request, 'dashboard/descriptive.html', context)
 
 
 @login_required(login_url='login')
-def anamap_dashboard(request):
+def descriptive_export(request, file_format):
+    """The descriptive dashboard's district table as CSV or XLSX, for the same years."""
     data = load_solar_excel()
+    aggregate = get_aggregate(data, years=descriptive_selected_years(request, data))
+    rows = sorted(descriptive_table_rows(data, aggregate), key=lambda x: x["district"].lower())
+    return export_response(
+        file_format,
+        "district_metrics_summary",
+        DESCRIPTIVE_EXPORT_COLUMNS,
+        rows,
+        sheet_title="District Metrics",
+    )
 
-    year_totals_by_district = defaultdict(lambda: defaultdict(lambda: {
-        "district": "",
-        "target": 0,
-        "installed": 0,
-    }))
-    average_totals_by_district = defaultdict(lambda: {
-        "district": "",
-        "target": 0,
-        "installed": 0,
-    })
-
-    years = set()
-
-    for row in data:
-        district_code = str(row.get("Distcode", "")).strip()
-        if not district_code:
-            continue
-
-        district_name = str(row.get("district", "")).strip()
-        year = str(row.get("year", "")).strip()
-        target = int(row.get("target", 0) or 0)
-        installed = int(row.get("installed", 0) or 0)
-
-        if not year:
-            continue
-
-        years.add(year)
-
-        year_row = year_totals_by_district[year][district_code]
-        year_row["district"] = district_name
-        year_row["target"] += target
-        year_row["installed"] += installed
 
-        avg_row = average_totals_by_district[district_code]
-        avg_row["district"] = district_name
-        avg_row["target"] += target
-        avg_row["installed"] += installed
+@login_required(login_url='login')
+def anamap_dashboard(request):
+    data = load_solar_excel()
+    aggregate = get_aggregate(data)
+
+    year_targets = aggregate.cubes["target"]
+    year_installed = aggregate.cubes["installed"]
+    year_present = aggregate.cube_counts > 0
+    district_present = aggregate.present
+
+    year_totals_by_district = {
+        year: {
+            data.district_codes[idx]: {
+                "district": data.district_names[idx],
+                "target": int(year_targets[idx, year_pos]),
+                "installed": int(year_installed[idx, year_pos]),
+            }
+            for idx in np.flatnonzero(year_present[:, year_pos])
+            if data.district_codes[idx]
+        }
+        for year_pos, year in enumerate(data.years)
+        if year
+    }
+    average_totals_by_district = {
+        data.district_codes[idx]: {
+            "district": data.district_names[idx],
+            "target": int(year_targets[idx].sum()),
+            "installed": int(year_installed[idx].sum()),
+        }
+        for idx in np.flatnonzero(district_present)
+        if data.district_codes[idx]
+    }
+    years = set(year_totals_by_district)
 
     def build_rate_payload(district_totals):
         payload = {}
@@ -788,35 +818,113 @@ def doughnut_piechart(request):
     return render(request, 'dashboard/charts/doughnut_piechart.html')
 
 
-@login_required(login_url='login')
-def view_uploaded_file_data(request, upload_id):
-    upload = get_object_or_404(SolarDataUpload, id=upload_id)
+def load_upload_preview(upload):
+    if not upload.file or not upload.file.storage.exists(upload.file.name):
+        raise Http404("Uploaded file not found.")
+    return load_preview(upload.file.path)
+
+
+def stream_uploaded_file_data(request, upload):
+    """The whole sheet as one table, sent in chunks while the rows are read.
 
+    The page is rendered once around a marker and the rows are streamed in
+    its place, so the first bytes go out at once and memory does not grow
+    with the sheet.
+    """
     if not upload.file or not upload.file.storage.exists(upload.file.name):
         raise Http404("Uploaded file not found.")
 
-    workbook = load_workbook(upload.file.path, read_only=True, data_only=True)
-    sheet = workbook.active
-    rows = list(sheet.iter_rows(values_only=True))
+    rows = iter_preview_rows(upload.file.path)
+    try:
+        # Unreadable files fail here, while a redirect is still possible
+        header = next(rows, None) or []
+    except ValidationError as exc:
+        messages.error(request, " ".join(exc.messages))
+        return redirect("dashboard")
+
+    marker = "<!-- upload rows -->"
+    page = render_to_string(
+        "dashboard/upload_data_view.html",
+        {
+            "upload": upload,
+            "headers": ["" if value is None else str(value) for value in header],
+            "stream_rows": mark_safe(marker),
+        },
+        request,
+    )
+    head, tail = page.split(marker, 1)
+
+    def content():
+        yield head
+        row_count = 0
+        for chunk in chunked(rows, PREVIEW_STREAM_CHUNK_ROWS):
+            row_count += len(chunk)
+            yield "".join(
+                "<tr>" + "".join(f"<td>{escape('' if value is None else value)}</td>" for value in row) + "</tr>\n"
+                for row in chunk
+            )
+        if not row_count:
+            yield '<tr><td class="text-center text-muted py-3">No data found in this file.</td></tr>'
+        yield tail
+
+    return StreamingHttpResponse(content(), content_type="text/html; charset=utf-8")
 
-    if rows:
-        headers = ["" if value is None else str(value) for value in rows[0]]
-        table_rows = [
-            ["" if value is None else value for value in row]
-            for row in rows[1:]
-        ]
-    else:
-        headers = []
-        table_rows = []
+
+@login_required(login_url='login')
+def view_uploaded_file_data(request, upload_id):
+    upload = get_object_or_404(SolarDataUpload, id=upload_id)
+
+    if request.GET.get("mode") == "full":
+        return stream_uploaded_file_data(request, upload)
+
+    # The first page is rendered here; the rest, and re-sorting, come from upload_preview_rows
+    try:
+        preview = load_upload_preview(upload)
+    except FileNotFoundError:
+        # The import job has not built the preview (yet), so show the sheet itself
+        return stream_uploaded_file_data(request, upload)
+    rows, next_cursor = preview.page()
 
     context = {
         "upload": upload,
-        "headers": headers,
-        "table_rows": table_rows,
+        "headers": preview.headers,
+        "table_rows": [["" if value is None else value for value in cells] for _, cells in rows],
+        "total_rows": preview.total,
+        "next_cursor": next_cursor,
     }
     return render(request, "dashboard/upload_data_view.html", context)
 
 
+@login_required(login_url='login')
+def upload_preview_rows(request, upload_id):
+    """One page of an upload's preview as JSON, for keyset pagination and sorting."""
+    upload = get_object_or_404(SolarDataUpload, id=upload_id)
+
+    try:
+        preview = load_upload_preview(upload)
+        sort = request.GET.get("sort") or None
+        after = request.GET.get("after") or None
+        rows, next_cursor = preview.page(
+            sort=None if sort is None else int(sort),
+            descending=request.GET.get("order") == "desc",
+            after=None if after is None else int(after),
+            limit=int(request.GET.get("limit") or PREVIEW_PAGE_SIZE),
+        )
+    except FileNotFoundError:
+        return JsonResponse({"error": "The preview of this file is not ready yet."}, status=404)
+    except ValueError:
+        return JsonResponse({"error": "Invalid sort, cursor or page size."}, status=400)
+
+    return JsonResponse(
+        {
+            "headers": preview.headers,
+            "total": preview.total,
+            "rows": [{"id": row_id, "cells": cells} for row_id, cells in rows],
+            "next": next_cursor,
+        }
+    )
+
+
 @login_required(login_url='login')
 def download_uploaded_file(request, upload_id):
     upload = get_object_or_404(SolarDataUpload, id=upload_id)
@@ -824,11 +932,13 @@ def download_uploaded_file(request, upload_id):
     if not upload.file or not upload.file.storage.exists(upload.file.name):
         raise Http404("Uploaded file not found.")
 
-    return FileResponse(
-        upload.file.open("rb"),
-        as_attachment=True,
-        filename=upload.original_filename,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    # The content hash is a strong validator, so it is used as the ETag when known
+    return serve_file(
+        request,
+        upload.file.path,
+        upload.original_filename,
+        content_type_for(upload.original_filename),
+        etag=f'"{upload.content_sha256}"' if upload.content_sha256 else None,
     )
 
 
@@ -841,9 +951,81 @@ def delete_uploaded_file(request, upload_id):
 
     delete_year_data(year_label)
 
-    if upload.file:
-        upload.file.delete(save=False)
+    upload.delete_file()
     upload.delete()
 
     messages.success(request, f"{filename} deleted successfully.")
-    return redirect("dashboard")
\ No newline at end of file
+    return redirect("dashboard")
+
+
+# JSON API for the dashboard charts. Payloads only change when the stored
+# data does, so the ETag is the data generation and browsers revalidate
+# with If-None-Match, getting a 304 until the next import or delete.
+
+API_VERSION = 1
+
+CHART_LIMIT = 10
+
+
+def solar_data_etag(request, *args, **kwargs):
+    return f"solar-v{API_VERSION}-{SolarDataGeneration.current()}"
+
+
+def solar_api(view):
+    """Login, GET only, private caching that must revalidate, and the generation ETag."""
+    view = condition(etag_func=solar_data_etag)(view)
+    view = cache_control(private=True, no_cache=True)(view)
+    view = require_GET(view)
+    return login_required(login_url='login')(view)
+
+
+def chart_series(rows, label_key, value_key, reverse=True):
+    ranked = sorted(rows, key=lambda x: x[value_key], reverse=reverse)[:CHART_LIMIT]
+    return {
+        "labels": [row[label_key] for row in ranked],
+        "values": [row[value_key] for row in ranked],
+    }
+
+
+def numeric_stat(value):
+    return 0 if value == MISSING else round(float(value), 2)
+
+
+@solar_api
+def api_solar_districts(request):
+    """The descriptive dashboard's district charts, for the same ``year`` filters."""
+    data = load_solar_excel()
+    selected_years = descriptive_selected_years(request, data)
+    rows = descriptive_table_rows(data, get_aggregate(data, years=selected_years))
+    count_stat, rate_stat = descriptive_statistics(sorted(rows, key=lambda x: x["district"].lower()))
+
+    charts = {
+        "top_installed": chart_series(rows, "district", "installed"),
+        "bottom_installed": chart_series(rows, "district", "installed", reverse=False),
+        "top_rejected": chart_series(rows, "district", "rejected"),
+        "top_booking_difference": chart_series(rows, "district", "booking_difference"),
+        "top_icr": chart_series(rows, "district", "installation_conversion_rate"),
+    }
+    charts["top_installed"]["mean"] = numeric_stat(count_stat("mean", "installed"))
+    charts["top_rejected"]["mean"] = numeric_stat(count_stat("mean", "rejected"))
+    charts["top_booking_difference"]["mean"] = numeric_stat(count_stat("mean", "booking_difference"))
+    charts["top_icr"]["mean"] = numeric_stat(rate_stat("mean", "installation_conversion_rate"))
+
+    return JsonResponse({"version": API_VERSION, "years": selected_years, "charts": charts})
+
+
+@solar_api
+def api_solar_forecast(request):
+    """The predictive dashboard's forecast table as columns plus rows of values."""
+    data = load_solar_excel()
+    selected_year, selected_engine, selected_districts = predictive_filters(request, data)
+    rows = forecast_table_rows(data, selected_year, selected_engine, selected_districts)
+    columns = [key for _, key in FORECAST_EXPORT_COLUMNS]
+
+    return JsonResponse({
+        "version": API_VERSION,
+        "year": selected_year,
+        "engine": selected_engine,
+        "columns": columns,
+        "rows": [[row.get(key) for key in columns] for row in rows],
+    })
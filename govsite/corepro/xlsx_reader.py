@@ -0,0 +1,336 @@
+"""Streaming reader for the first-party xlsx uploads.
+
+openpyxl builds a cell object for every value even in read-only mode. For the
+plain district sheets we import, reading the worksheet XML straight out of the
+zip is two to three times faster: the worksheet goes through expat callbacks without
+building any element objects, and only the wanted cells are decoded.
+``open_sheet`` uses this reader and falls back to openpyxl for workbooks it does
+not understand.
+"""
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import ParseError, iterparse
+from xml.etree.ElementTree import parse as parse_xml
+from xml.parsers import expat
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from openpyxl import load_workbook
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+TEXT_TAG = f"{MAIN_NS}t"
+PHONETIC_TAG = f"{MAIN_NS}rPh"
+
+READ_CHUNK_SIZE = 64 * 1024
+
+DIMENSION = re.compile(r"^[A-Z]+\d+:([A-Z]+)\d+$")
+# The sheet is parsed without namespace processing, so its elements must use
+# the default namespace (``<c>``, not ``<x:c>``); anything else goes to openpyxl.
+PREFIXED_WORKSHEET = re.compile(rb"<[A-Za-z_][\w.-]*:worksheet[\s>]")
+
+# settings.SOLAR_XLSX_READER: "fast" tries this reader first, "openpyxl" always
+# uses openpyxl.
+DEFAULT_XLSX_READER = "fast"
+
+
+class UnsupportedWorkbook(Exception):
+    """The workbook uses something the fast reader does not handle."""
+
+
+_column_indexes = {}
+
+
+def column_index(letters):
+    """Zero-based index of a column reference such as ``"A"`` or ``"AB"``."""
+    index = _column_indexes.get(letters)
+    if index is None:
+        index = -1
+        for letter in letters:
+            index = (index + 1) * 26 + ord(letter) - 65
+        _column_indexes[letters] = index
+    return index
+
+
+def _cast_number(value):
+    # Same rule as openpyxl: anything with a decimal point or exponent is a float
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _string_item_text(element):
+    """Text of a shared or inline string, joining rich-text runs and skipping phonetics."""
+    parts = []
+    for child in element.iter():
+        if child.tag == PHONETIC_TAG:
+            break
+        if child.tag == TEXT_TAG and child.text:
+            parts.append(child.text)
+    return "".join(parts)
+
+
+class FastSheet:
+    """Active worksheet of an xlsx file, read directly from its XML parts."""
+
+    def __init__(self, file_path):
+        try:
+            self.archive = zipfile.ZipFile(file_path)
+        except (zipfile.BadZipFile, OSError) as exc:
+            raise UnsupportedWorkbook(str(exc)) from exc
+
+        try:
+            self.sheet_path, self.epoch = self._locate_active_sheet()
+            self.shared_strings = self._read_shared_strings()
+            self.date_styles, self.timedelta_styles = self._read_date_styles()
+            with self.archive.open(self.sheet_path) as part:
+                if PREFIXED_WORKSHEET.search(part.read(READ_CHUNK_SIZE)):
+                    raise ValueError("Worksheet elements use a namespace prefix")
+        except (KeyError, ValueError, ParseError) as exc:
+            self.close()
+            raise UnsupportedWorkbook(str(exc)) from exc
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _parse_part(self, name):
+        with self.archive.open(name) as part:
+            return parse_xml(part).getroot()
+
+    def _locate_active_sheet(self):
+        workbook = self._parse_part("xl/workbook.xml")
+
+        properties = workbook.find(f"{MAIN_NS}workbookPr")
+        date1904 = properties is not None and properties.get("date1904") in ("1", "true")
+
+        view = workbook.find(f"{MAIN_NS}bookViews/{MAIN_NS}workbookView")
+        active_tab = int(view.get("activeTab", 0)) if view is not None else 0
+        sheets = workbook.findall(f"{MAIN_NS}sheets/{MAIN_NS}sheet")
+        if not sheets:
+            raise ValueError("Workbook has no sheets")
+        # Like Excel, open the first sheet when activeTab points past the last one
+        if not 0 <= active_tab < len(sheets):
+            active_tab = 0
+        relation_id = sheets[active_tab].get(f"{REL_NS}id")
+
+        relations = self._parse_part("xl/_rels/workbook.xml.rels")
+        for relation in relations.iter(f"{PACKAGE_REL_NS}Relationship"):
+            if relation.get("Id") == relation_id:
+                target = relation.get("Target")
+                break
+        else:
+            raise KeyError(f"No relationship {relation_id} for the active sheet")
+
+        if target.startswith("/"):
+            sheet_path = target.lstrip("/")
+        else:
+            sheet_path = posixpath.normpath(posixpath.join("xl", target))
+        return sheet_path, CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+    def _read_shared_strings(self):
+        if "xl/sharedStrings.xml" not in self.archive.namelist():
+            return []
+
+        strings = []
+        with self.archive.open("xl/sharedStrings.xml") as part:
+            for _, element in iterparse(part):
+                if element.tag == f"{MAIN_NS}si":
+                    strings.append(_string_item_text(element))
+                    element.clear()
+        return strings
+
+    def _read_date_styles(self):
+        if "xl/styles.xml" not in self.archive.namelist():
+            return set(), set()
+
+        styles = self._parse_part("xl/styles.xml")
+        formats = dict(BUILTIN_FORMATS)
+        for number_format in styles.iter(f"{MAIN_NS}numFmt"):
+            formats[int(number_format.get("numFmtId"))] = number_format.get("formatCode", "")
+
+        date_styles = set()
+        timedelta_styles = set()
+        cell_formats = styles.find(f"{MAIN_NS}cellXfs")
+        for style_id, cell_format in enumerate(cell_formats if cell_formats is not None else []):
+            code = formats.get(int(cell_format.get("numFmtId", 0)), "")
+            if is_date_format(code):
+                date_styles.add(str(style_id))
+                if is_timedelta_format(code):
+                    timedelta_styles.add(str(style_id))
+        return date_styles, timedelta_styles
+
+    def _decode(self, data_type, style, text):
+        if data_type == "inlineStr":
+            return text
+        if not text:
+            return None
+
+        if data_type == "n":
+            number = _cast_number(text)
+            if style in self.date_styles:
+                return from_excel(number, self.epoch, timedelta=style in self.timedelta_styles)
+            return number
+        if data_type == "s":
+            return self.shared_strings[int(text)]
+        if data_type == "b":
+            return bool(int(text))
+        if data_type == "d":
+            return from_ISO8601(text)
+        # "str" (formula result) and "e" (error code) are plain text
+        return text
+
+    def rows(self, columns=None, min_row=1):
+        """Yield each row from ``min_row`` on as a tuple of values.
+
+        With ``columns`` (zero-based positions) only those cells are decoded
+        and the tuples follow that order; otherwise rows are padded to the
+        sheet width the way openpyxl's ``values_only`` rows are. Gaps in the
+        row numbering are yielded as empty rows.
+        """
+        wanted = None if columns is None else {column: pos for pos, column in enumerate(columns)}
+        handler = _SheetHandler(wanted)
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = handler.start
+        parser.EndElementHandler = handler.end
+        parser.CharacterDataHandler = handler.data
+        expected_row = min_row
+
+        with self.archive.open(self.sheet_path) as part:
+            while True:
+                chunk = part.read(READ_CHUNK_SIZE)
+                try:
+                    parser.Parse(chunk, not chunk)
+                except expat.ExpatError as exc:
+                    # Only the start of the sheet was checked on open, so a
+                    # corrupt part can still turn up halfway through
+                    raise ValidationError("The file could not be read as an Excel workbook.") from exc
+
+                finished, handler.rows = handler.rows, []
+                for row_number, cells in finished:
+                    if row_number < min_row:
+                        continue
+
+                    if columns is not None:
+                        width = len(columns)
+                    else:
+                        width = max(handler.width or 0, max(cells, default=-1) + 1)
+
+                    while expected_row < row_number:
+                        yield (None,) * width
+                        expected_row += 1
+
+                    values = [None] * width
+                    for position, (data_type, style, text) in cells.items():
+                        values[position] = self._decode(data_type, style, text)
+                    yield tuple(values)
+                    expected_row = row_number + 1
+
+                if not chunk:
+                    return
+
+
+class _SheetHandler:
+    """expat callbacks that collect the raw cells of each finished row.
+
+    Only ``(type, style, text)`` of the wanted cells is kept; decoding waits
+    until the row is yielded.
+    """
+
+    def __init__(self, wanted):
+        self.wanted = wanted
+        self.rows = []
+        self.width = None
+        self.row_number = 0
+        self.cells = {}
+        self.next_column = 0
+        self.cell = None
+        self.parts = None
+        self.text = None
+        self.in_phonetic = False
+
+    def start(self, tag, attrib):
+        if tag == "c":
+            reference = attrib.get("r")
+            position = column_index(reference.rstrip("0123456789")) if reference else self.next_column
+            self.next_column = position + 1
+            if self.wanted is not None:
+                position = self.wanted.get(position)
+            self.cell = None if position is None else (position, attrib.get("t", "n"), attrib.get("s"))
+            self.parts = []
+        elif tag == "v" or tag == "t":
+            if self.cell is not None and not self.in_phonetic:
+                self.text = self.parts
+        elif tag == "row":
+            self.row_number = int(attrib.get("r", self.row_number + 1))
+            self.cells = {}
+            self.next_column = 0
+        elif tag == "rPh":
+            self.in_phonetic = True
+        elif tag == "dimension" and self.wanted is None:
+            match = DIMENSION.match(attrib.get("ref", ""))
+            if match:
+                self.width = column_index(match.group(1)) + 1
+
+    def data(self, text):
+        if self.text is not None:
+            self.text.append(text)
+
+    def end(self, tag):
+        if tag == "v" or tag == "t":
+            self.text = None
+        elif tag == "c":
+            if self.cell is not None:
+                position, data_type, style = self.cell
+                self.cells[position] = (data_type, style, "".join(self.parts))
+            self.cell = None
+        elif tag == "row":
+            self.rows.append((self.row_number, self.cells))
+        elif tag == "rPh":
+            self.in_phonetic = False
+
+
+class OpenpyxlSheet:
+    """The same ``rows`` interface on top of openpyxl's read-only mode."""
+
+    def __init__(self, file_path):
+        self.workbook = load_workbook(file_path, read_only=True, data_only=True)
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def rows(self, columns=None, min_row=1):
+        for row in self.workbook.active.iter_rows(min_row=min_row, values_only=True):
+            if columns is None:
+                yield row
+            else:
+                yield tuple(row[column] if column < len(row) else None for column in columns)
+
+
+def open_sheet(file_path, reader=None):
+    """Open the active sheet of ``file_path`` with the fast reader when possible."""
+    reader = reader or getattr(settings, "SOLAR_XLSX_READER", DEFAULT_XLSX_READER)
+    if reader == "fast":
+        try:
+            return FastSheet(file_path)
+        except UnsupportedWorkbook:
+            pass
+    return OpenpyxlSheet(file_path)